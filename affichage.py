@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Tableau d'affichage statique (sans Streamlit) : `scoreboard.json` + `index.html`.
+
+`donnees(t)` met le tournoi en lignes prêtes à afficher (classement, Top 8, rounds avec
+terrains, phases finales, poules, tableaux) ; `Affichage.publier` les écrit dans un
+dossier local seulement quand les résultats ont changé (clé uid, rev, version), par
+remplacement atomique. N'importe quel serveur statique ou le navigateur d'une TV relit
+ces fichiers sans rien recalculer ; la page HTML se recharge toute seule.
+"""
+import html
+import json
+import os
+import time
+
+import moteur
+
+RAFRAICHIR = 15   # secondes entre deux rechargements de index.html
+TITRES_SECTIONS = {"poules": "Poules", "poules_manual": "Poules (manuelles)"}
+TITRES_TABLEAUX = {"main_bracket": "Tableau principal", "cons_bracket": "Tableau consolante"}
+PHASES = (("Quarts de finale", "quarts", "rl_quart_{}"), ("Demi-finales", "demis", "rl_demi_{}"),
+          ("Finale", "finale", "rl_finale"))
+
+# =========================
+#   DONNÉES
+# =========================
+def _matchs(t, matchs, numero="Match"):
+    """[(clé, A, B), ...] → [{numero, "Équipe 1", "Équipe 2", "Score"}, ...] (numérotés à partir de 1)."""
+    return [{numero: i, "Équipe 1": f"{A[0]}+{A[1]}", "Équipe 2": f"{B[0]}+{B[1]}", "Score": t.scores.get(key, "")}
+            for i, (key, A, B) in enumerate(matchs, start=1)]
+
+def lignes_classement(t):
+    """Classement général : [{"Rang", "Joueur", "Points" (1 décimale), "Jeux", "Matchs", "Sexe"}, ...]."""
+    cols = moteur.classement_colonnes(t)
+    return [{"Rang": rang, "Joueur": j, "Points": round(p, 1), "Jeux": g, "Matchs": m, "Sexe": s}
+            for rang, (j, p, g, m, s) in enumerate(zip(*(c.tolist() for c in cols.values())), start=1)]
+
+def top8(classement, sexe):
+    return [{k: r[k] for k in ("Joueur", "Points", "Jeux", "Matchs")} for r in classement if r["Sexe"] == sexe][:8]
+
+def lignes_poule(t, name, p_idx):
+    """Classement d'une poule : [{"Rang", "Equipe", "Points", "Jeux", "Diff"}, ...]."""
+    teams = t.section(name)["teams"]
+    return [{"Rang": rang, "Equipe": f"{teams[d['team']][0]}+{teams[d['team']][1]}",
+             "Points": round(d["Pts"], 1), "Jeux": d["Jeux"], "Diff": d["Diff"]}
+            for rang, d in enumerate(moteur.classement_poule(t, name, p_idx), start=1)]
+
+def donnees(t):
+    """Instantané JSON-compatible du tournoi (listes de lignes {colonne: valeur})."""
+    classement = lignes_classement(t)
+    rounds = [{"round": r, "matchs": _matchs(t, [(f"score_{r}_{i}", e1, e2) for i, (e1, e2) in enumerate(matches)],
+                                             numero="Terrain")}
+              for r, matches in enumerate(t.matchs, start=1)]
+    finales = [{"phase": titre, "matchs": _matchs(t, [(modele.format(i), A, B)
+                                                     for i, (A, B) in enumerate(t.finals[phase])])}
+               for titre, phase, modele in PHASES if t.finals.get(phase)]
+    poules, tableaux = [], []
+    for name, pfx in moteur.PREFIXES.items():
+        section = t.section(name)
+        teams = section["teams"]
+        if section["pools"]:
+            poules.append({"section": TITRES_SECTIONS[name], "poules": [{
+                "poule": p_idx + 1,
+                "classement": lignes_poule(t, name, p_idx),
+                "matchs": _matchs(t, [(f"{pfx['pool']}_{p_idx}_m_{m_idx}", teams[ti], teams[tj])
+                                      for m_idx, (ti, tj) in enumerate(pool["matches"])]),
+            } for p_idx, pool in enumerate(section["pools"])]})
+        for bracket, titre in TITRES_TABLEAUX.items():
+            b = section[bracket]
+            if not b["arbre"]:
+                continue
+            vainqueur = moteur.champion(b)
+            tableaux.append({
+                "section": TITRES_SECTIONS[name], "tableau": titre,
+                "tours": [{"tour": r_idx, "matchs": _matchs(t, [
+                              (f"{pfx[bracket]}_r{r_idx}_m{m_idx}", teams[A], teams[B])
+                              for m_idx, A, B in moteur.matchs_tour(b, r_idx)])}
+                          for r_idx in range(1, moteur.tours_ouverts(b) + 1)],
+                "vainqueurs": None if vainqueur is None else " & ".join(teams[vainqueur]),
+            })
+    return {"classement": classement, "top8": {sexe: top8(classement, sexe) for sexe in "HF"}, "rounds": rounds, "finales": finales,
+            "poules": poules, "tableaux": tableaux}
+
+# =========================
+#   HTML
+# =========================
+STYLE = """
+body{font-family:system-ui,sans-serif;margin:1rem;background:#111;color:#eee}
+h1{margin:.2rem 0}h2{border-bottom:1px solid #444;margin-top:1.4rem}
+.grille{display:flex;flex-wrap:wrap;gap:1.5rem}
+table{border-collapse:collapse;margin:.3rem 0}th,td{padding:.2rem .6rem;border-bottom:1px solid #333;text-align:left}
+th{color:#9cf}.maj{color:#888}.vainqueurs{color:#fc6;font-weight:bold}
+"""
+
+def table_html(lignes):
+    """[{colonne: valeur}, ...] → <table> (colonnes dans l'ordre d'apparition, cellule absente = vide)."""
+    if not lignes:
+        return "<p>—</p>"
+    colonnes = list(dict.fromkeys(c for r in lignes for c in r))
+    entetes = "".join(f"<th>{html.escape(str(c))}</th>" for c in colonnes)
+    corps = "".join("<tr>" + "".join(f"<td>{html.escape(str(r.get(c, '')))}</td>" for c in colonnes) + "</tr>"
+                    for r in lignes)
+    return f"<table><tr>{entetes}</tr>{corps}</table>"
+
+def _bloc(titre, contenu):
+    return f"<div><h3>{html.escape(titre)}</h3>{contenu}</div>"
+
+def page_html(d, maj):
+    """Page autonome : round en cours (terrains), Top 8, tableaux, poules, phases finales, classement."""
+    parties = [f"<h1>🎾 Tournoi de Padel</h1><p class='maj'>Mis à jour à {time.strftime('%H:%M:%S', time.localtime(maj))}</p>"]
+    if d["rounds"]:
+        courant = d["rounds"][-1]
+        parties.append(f"<h2>Round {courant['round']} – terrains</h2>" + table_html(courant["matchs"]))
+    parties.append("<h2>Top 8</h2><div class='grille'>" + _bloc("🥇 Hommes", table_html(d["top8"]["H"]))
+                   + _bloc("🏅 Femmes", table_html(d["top8"]["F"])) + "</div>")
+    for tab in d["tableaux"]:
+        contenu = "".join(_bloc(f"Tour {tour['tour']}", table_html(tour["matchs"])) for tour in tab["tours"])
+        if tab["vainqueurs"]:
+            contenu += f"<p class='vainqueurs'>🏆 Vainqueurs : {html.escape(tab['vainqueurs'])}</p>"
+        parties.append(f"<h2>{html.escape(tab['tableau'])} – {html.escape(tab['section'])}</h2>"
+                       f"<div class='grille'>{contenu}</div>")
+    for sec in d["poules"]:
+        parties.append(f"<h2>{html.escape(sec['section'])}</h2><div class='grille'>"
+                       + "".join(_bloc(f"Poule {p['poule']}", table_html(p["classement"])) for p in sec["poules"])
+                       + "</div>")
+    if d["finales"]:
+        parties.append("<h2>Phases finales</h2><div class='grille'>"
+                       + "".join(_bloc(f["phase"], table_html(f["matchs"])) for f in d["finales"]) + "</div>")
+    parties.append("<h2>Classement général</h2>" + table_html(d["classement"]))
+    return ("<!doctype html><html lang='fr'><head><meta charset='utf-8'>"
+            f"<meta http-equiv='refresh' content='{RAFRAICHIR}'>"
+            "<meta name='viewport' content='width=device-width,initial-scale=1'>"
+            f"<title>Tournoi de Padel</title><style>{STYLE}</style></head><body>"
+            + "".join(parties) + "</body></html>")
+
+# =========================
+#   PUBLICATION
+# =========================
+def _ecrire(chemin, texte):
+    with open(chemin + ".tmp", "w", encoding="utf-8") as fh:
+        fh.write(texte)
+    os.replace(chemin + ".tmp", chemin)   # un lecteur ne voit jamais un fichier à moitié écrit
+
+class Affichage:
+    """Dossier de sortie ; `publier` ne réécrit que si les résultats ont changé depuis la dernière fois."""
+    def __init__(self, dossier):
+        os.makedirs(dossier, exist_ok=True)
+        self.dossier = dossier
+        self.cle = None
+
+    def publier(self, t):
+        cle = (t.uid, t.rev, t.version)
+        if cle == self.cle:
+            return False
+        d = donnees(t)
+        maj = time.time()
+        _ecrire(os.path.join(self.dossier, "scoreboard.json"),
+                json.dumps({"maj": maj, "version": t.version, **d}, ensure_ascii=False, separators=(",", ":")))
+        _ecrire(os.path.join(self.dossier, "index.html"), page_html(d, maj))
+        self.cle = cle
+        return True
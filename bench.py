@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""Banc d'essai reproductible des chemins chauds du moteur.
+
+Rosters synthétiques (16 → 5000 joueurs), 1 → 10 terrains, 1 → 16 poules, graines
+fixes : deux exécutions sur le même code produisent exactement les mêmes tournois.
+Chaque cas mesure le temps (médiane de plusieurs répétitions) et le pic mémoire
+(tracemalloc, sur une exécution à part) ; une ligne JSON par exécution est ajoutée au
+fichier de résultats, avec le commit courant, pour comparer d'un commit à l'autre.
+
+Exemples :
+    python bench.py                       # grille complète → bench_resultats.jsonl
+    python bench.py --rapide --filtre generer_round
+    python bench.py --comparer            # compare à la dernière exécution enregistrée
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import affichage
+import moteur
+
+GRAINE = 2024
+SORTIE_DEFAUT = "bench_resultats.jsonl"
+SEUIL_REGRESSION = 1.25      # ratio de temps au-delà duquel un cas est signalé
+
+JOUEURS  = (16, 100, 500, 2000, 5000)
+TERRAINS = (1, 4, 10)
+POULES   = (1, 4, 16)
+
+# =========================
+#   DONNÉES SYNTHÉTIQUES
+# =========================
+def roster(n):
+    """n joueurs, moitié hommes moitié femmes (noms stables)."""
+    return [f"H{i:05d}" for i in range(n - n // 2)], [f"F{i:05d}" for i in range(n // 2)]
+
+def tournoi_rounds(n, terrains, max_matchs, graine=GRAINE):
+    t = moteur.Tournoi()
+    moteur.sync_joueurs(t, *roster(n))
+    moteur.generer_tous_rounds(t, terrains, max_matchs, random.Random(graine))
+    return t
+
+def saisir_aleatoire(t, graine=GRAINE):
+    """Un score tiré au sort pour chaque match planifié (gagnant à 6 jeux)."""
+    rng = random.Random(graine)
+    for key, _, _ in moteur.iter_matchs_scores(t):
+        perdant = rng.randint(0, 4)
+        t.scores[key] = f"6-{perdant}" if rng.random() < 0.5 else f"{perdant}-6"
+    t.ledger["dirty"] = True
+
+# =========================
+#   CAS
+# =========================
+def cas():
+    """(nom, préparation, fonction mesurée) ; la préparation n'est pas chronométrée
+       et refaite avant chaque répétition (la fonction peut muter son état)."""
+    for n in JOUEURS:
+        for k in TERRAINS:
+            def prep(n=n):
+                t = moteur.Tournoi(); moteur.sync_joueurs(t, *roster(n)); return t
+            yield (f"generer_round/joueurs={n}/terrains={k}", prep,
+                   lambda t, k=k: moteur.generer_round(t, k, 4, random.Random(GRAINE)))
+        for k in (1, 10):
+            def prep(n=n):
+                t = moteur.Tournoi(); moteur.sync_joueurs(t, *roster(n)); return t
+            yield (f"generer_tous_rounds/joueurs={n}/terrains={k}", prep,
+                   lambda t, k=k: moteur.generer_tous_rounds(t, k, 2, random.Random(GRAINE)))
+        def prep(n=n):
+            t = tournoi_rounds(n, 10, 4); saisir_aleatoire(t); return t
+        yield f"maj_classement_global/joueurs={n}", prep, moteur.maj_classement_global
+        def prep(n=n):
+            # un round Mexicano déjà joué : le tirage suivant lit le classement incrémental
+            t = moteur.Tournoi(); moteur.sync_joueurs(t, *roster(n))
+            moteur.generer_round(t, 10, 4, random.Random(GRAINE), formule="mexicano")
+            for i, (e1, e2) in enumerate(t.matchs[-1]):
+                moteur.saisir_score(t, f"score_1_{i}", "6-3", e1, e2)
+            return t
+        yield (f"generer_round_mexicano/joueurs={n}/terrains=10", prep,
+               lambda t: moteur.generer_round(t, 10, 4, random.Random(GRAINE), formule="mexicano"))
+        def prep(n=n):
+            t = tournoi_rounds(n, 10, 4); saisir_aleatoire(t); moteur.maj_classement_global(t); return t
+        yield (f"table_classement/joueurs={n}", prep,
+               lambda t: affichage.table_html(affichage.lignes_classement(t)))
+    for n in (4, 12, 64):
+        yield f"round_robin_indices/equipes={n}", lambda: None, lambda _, n=n: moteur.round_robin_indices(n)
+    for nb_p in POULES:
+        def prep(nb_p=nb_p):
+            t = moteur.Tournoi(); moteur.sync_joueurs(t, *roster(2 * nb_p * 12))
+            t.poules["params"].update(nb_poules=nb_p, teams_per_pool=12)
+            return t
+        yield (f"build_pools/poules={nb_p}/equipes=12", prep,
+               lambda t: moteur.build_pools(t, *roster(len(t.joueurs)), random.Random(GRAINE)))
+        def prep_niveaux(nb_p=nb_p):
+            t = prep(nb_p); rng = random.Random(GRAINE)
+            t.niveaux = {n: rng.uniform(1, 7) for n in t.joueurs.noms}
+            return t
+        yield (f"build_pools_equilibre/poules={nb_p}/equipes=12", prep_niveaux,
+               lambda t: moteur.build_pools(t, *roster(len(t.joueurs)), random.Random(GRAINE), equilibre=True))
+    if importlib.util.find_spec("streamlit"):
+        yield "demarrage/premier_rendu", lambda: None, premier_rendu
+
+# Import de Streamlit + de l'application et premier rendu complet, dans un interpréteur neuf
+# (base vide) : ce que paie une nouvelle instance du serveur avant le premier affichage
+# organisateur (clé fournie dans l'adresse).
+DEMARRAGE = """
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=60)
+at.query_params["orga"] = "bench"
+at.run()
+assert not at.exception, at.exception
+"""
+
+def premier_rendu(_):
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tournoi.py")
+    with tempfile.TemporaryDirectory() as d:
+        env = dict(os.environ, TOURNOI_DB=os.path.join(d, "tournoi.db"), TOURNOI_CLE_ORGA="bench")
+        subprocess.run([sys.executable, "-c", DEMARRAGE.format(app=app)], env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+# cas exécutés dans un autre interpréteur : tracemalloc n'y voit rien, pic mémoire non mesuré
+HORS_PROCESSUS = (premier_rendu,)
+
+# =========================
+#   MESURE
+# =========================
+def mesurer(prep, fn, duree_min=0.2, repetitions_min=3, repetitions_max=50, memoire=True):
+    """Médiane du temps de `fn(prep())` ; pic mémoire Python (tracemalloc) sur une exécution
+       à part, None si memoire=False."""
+    temps = []
+    total = 0.0
+    while len(temps) < repetitions_min or (total < duree_min and len(temps) < repetitions_max):
+        etat = prep()
+        t0 = time.perf_counter()
+        fn(etat)
+        dt = time.perf_counter() - t0
+        temps.append(dt); total += dt
+    pic = None
+    if memoire:
+        etat = prep()
+        tracemalloc.start()
+        fn(etat)
+        _, pic = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"ms": round(statistics.median(temps) * 1000, 3),
+            "min_ms": round(min(temps) * 1000, 3),
+            "repetitions": len(temps),
+            "pic_ko": None if pic is None else round(pic / 1024, 1)}
+
+def commit_courant():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def derniere_execution(chemin):
+    try:
+        with open(chemin, encoding="utf-8") as fh:
+            lignes = [l for l in fh if l.strip()]
+    except FileNotFoundError:
+        return None
+    return json.loads(lignes[-1]) if lignes else None
+
+def comparer(avant, apres, seuil=SEUIL_REGRESSION, out=sys.stdout):
+    """Ratios de temps cas par cas ; renvoie les cas dont le temps dépasse seuil × avant."""
+    regressions = []
+    print(f"comparaison {avant.get('commit')} → {apres.get('commit')}", file=out)
+    for nom, r in apres["resultats"].items():
+        ref = avant["resultats"].get(nom)
+        if not ref or not ref["ms"]:
+            continue
+        ratio = r["ms"] / ref["ms"]
+        marque = "  ← régression" if ratio > seuil else ""
+        print(f"{nom:<48} {ref['ms']:>10.3f} → {r['ms']:>10.3f} ms  x{ratio:5.2f}{marque}", file=out)
+        if ratio > seuil:
+            regressions.append(nom)
+    return regressions
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Banc d'essai du moteur de tournoi")
+    ap.add_argument("--sortie", default=SORTIE_DEFAUT, help="fichier JSON-lines où ajouter les résultats")
+    ap.add_argument("--filtre", default="", help="ne lance que les cas dont le nom contient ce texte")
+    ap.add_argument("--rapide", action="store_true", help="rosters ≤ 500 joueurs seulement")
+    ap.add_argument("--comparer", action="store_true",
+                    help="compare à la dernière exécution du fichier (code 1 en cas de régression)")
+    ap.add_argument("--seuil", type=float, default=SEUIL_REGRESSION)
+    args = ap.parse_args(argv)
+
+    avant = derniere_execution(args.sortie) if args.comparer else None
+    resultats = {}
+    for nom, prep, fn in cas():
+        if args.filtre not in nom:
+            continue
+        if args.rapide and any(f"joueurs={n}" in nom for n in JOUEURS if n > 500):
+            continue
+        r = resultats[nom] = mesurer(prep, fn, memoire=fn not in HORS_PROCESSUS)
+        pic = "—" if r["pic_ko"] is None else f"{r['pic_ko']:.1f}"
+        print(f"{nom:<48} {r['ms']:>10.3f} ms  {pic:>10} Ko", file=sys.stderr)
+
+    execution = {
+        "commit": commit_courant(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "graine": GRAINE,
+        "resultats": resultats,
+    }
+    with open(args.sortie, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(execution, ensure_ascii=False) + "\n")
+
+    if avant and comparer(avant, execution, args.seuil):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""Imports / exports de fichiers (roster CSV / XLSX, scores en lot, tables CSV / Parquet),
+sans Streamlit.
+
+Les lignes sont lues et écrites en flux (csv, openpyxl en lecture seule, ParquetWriter
+par paquets) : un roster ou une archive de saison n'est jamais chargé en entier sous
+forme de tableau intermédiaire.
+"""
+import csv
+import io
+import os
+import re
+
+import moteur
+
+# En-têtes reconnus (minuscules, sans accents ni espaces superflus)
+COLONNES = {
+    "nom":    ("nom", "name", "joueur", "joueuse", "player", "membre"),
+    "sexe":   ("sexe", "sex", "genre", "gender", "h/f"),
+    "niveau": ("niveau", "rating", "classement", "elo", "level", "note"),
+}
+SEXES = {
+    "h": "H", "m": "H", "homme": "H", "male": "H", "man": "H", "masculin": "H",
+    "f": "F", "w": "F", "femme": "F", "female": "F", "woman": "F", "féminin": "F", "feminin": "F",
+}
+
+def _norm(x):
+    return str(x).strip().lower() if x is not None else ""
+
+def lignes_fichier(flux, nom_fichier):
+    """Itère les lignes (listes de cellules) d'un CSV ou d'un XLSX (1re feuille).
+       `flux` : fichier binaire ouvert (ou UploadedFile Streamlit)."""
+    ext = os.path.splitext(nom_fichier)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        try:
+            import openpyxl
+        except ImportError:
+            raise ValueError("Lecture XLSX indisponible : installer openpyxl (ou exporter en CSV).")
+        wb = openpyxl.load_workbook(flux, read_only=True, data_only=True)
+        try:
+            for row in wb.worksheets[0].iter_rows(values_only=True):
+                yield ["" if c is None else c for c in row]
+        finally:
+            wb.close()
+        return
+    texte = io.TextIOWrapper(flux, encoding="utf-8-sig", newline="")
+    debut = texte.read(4096)
+    try:
+        dialecte = csv.Sniffer().sniff(debut, delimiters=",;\t")
+    except csv.Error:
+        dialecte = csv.excel
+    texte.seek(0)
+    try:
+        yield from csv.reader(texte, dialecte)
+    finally:
+        texte.detach()   # rend le flux binaire à l'appelant sans le fermer
+
+def lire_roster(lignes):
+    """Lignes (nom, sexe[, niveau]) → {"hommes", "femmes", "niveaux", "erreurs", "doublons"}.
+       En-tête facultatif (voir COLONNES) ; sans en-tête, colonnes dans cet ordre.
+       Un nom déjà vu garde sa première occurrence ; lignes invalides listées (n°, motif)."""
+    hommes, femmes, niveaux, erreurs = [], [], {}, []
+    vus = set(); doublons = 0
+    pos = {"nom": 0, "sexe": 1, "niveau": 2}
+    premiere = True
+    for n, row in enumerate(lignes, start=1):
+        cells = [_norm(c) for c in row]
+        if not any(cells):
+            continue
+        if premiere:
+            premiere = False
+            entetes = {c: i for i, c in enumerate(cells)}
+            trouve = {k: next((entetes[a] for a in alias if a in entetes), None) for k, alias in COLONNES.items()}
+            if trouve["nom"] is not None:
+                if trouve["sexe"] is None:
+                    raise ValueError("Colonne sexe introuvable (sexe / sex / genre).")
+                pos = trouve
+                continue
+        get = lambda k: row[pos[k]] if pos[k] is not None and pos[k] < len(row) else None
+        nom = str(get("nom") or "").strip()
+        if not nom:
+            erreurs.append((n, "nom vide")); continue
+        sexe = SEXES.get(_norm(get("sexe")))
+        if sexe is None:
+            erreurs.append((n, f"sexe {get('sexe')!r} non reconnu")); continue
+        if nom in vus:
+            doublons += 1; continue
+        vus.add(nom)
+        (hommes if sexe == "H" else femmes).append(nom)
+        brut = get("niveau")
+        if brut not in (None, ""):
+            try:
+                niveaux[nom] = float(str(brut).replace(",", "."))
+            except ValueError:
+                erreurs.append((n, f"niveau {brut!r} invalide (ignoré)"))
+    return {"hommes": hommes, "femmes": femmes, "niveaux": niveaux, "erreurs": erreurs, "doublons": doublons}
+
+def lignes_texte(flux):
+    """Lignes d'un fichier texte binaire (UTF-8, BOM toléré), en flux, sans le fermer."""
+    texte = io.TextIOWrapper(flux, encoding="utf-8-sig", newline="")
+    try:
+        yield from texte
+    finally:
+        texte.detach()
+
+def lire_scores(lignes):
+    """Lignes `clé,score` (ou `clé;score`, `clé<tab>score`, `clé score`) → [(n°, clé, saisie)].
+       Lignes vides, commentaires # et en-tête (`match_id,score`...) ignorés."""
+    res = []
+    for n, line in enumerate(lignes, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = re.split(r"[,;\s]+", line, maxsplit=1)
+        key, raw = parts[0], (parts[1] if len(parts) > 1 else "").strip()
+        if _norm(key) in ("match_id", "match", "cle", "clé", "key") and not moteur.parse_score(raw):
+            continue
+        res.append((n, key, raw))
+    return res
+
+def valider_scores(t, lignes):
+    """Trie les lignes lues par lire_scores : (items valides [(clé, saisie)], erreurs [(n°, motif)]).
+       Score vide = effacement ; même règle que parse_score ; match inconnu ou clé répétée refusés."""
+    index = moteur.index_matchs(t)
+    items, erreurs, vues = [], [], {}
+    for n, key, raw in lignes:
+        if key not in index:
+            erreurs.append((n, f"match inconnu {key!r}"))
+        elif raw and not moteur.parse_score(raw):
+            erreurs.append((n, f"score invalide {raw!r} (attendu ex. 6-4)"))
+        elif key in vues:
+            erreurs.append((n, f"{key} déjà saisi ligne {vues[key]}"))
+        else:
+            vues[key] = n
+            items.append((key, raw))
+    return items, erreurs
+
+# =========================
+#   EXPORTS
+# =========================
+# Chaque table = colonnes typées + générateur de lignes (tuples) : les écrivains consomment
+# les lignes au fil de l'eau, par paquets de TAILLE_LOT pour Parquet.
+TAILLE_LOT = 10_000
+
+def _score(t, key):
+    raw = t.scores.get(key, "")
+    sc = moteur.parse_score(raw)
+    return (raw, *sc) if sc else (raw, None, None)
+
+def _lignes_classement(t):
+    cols = moteur.classement_colonnes(t)
+    for rang, vals in enumerate(zip(*(c.tolist() for c in cols.values())), start=1):
+        yield (rang, *vals)
+
+def _lignes_rounds(t):
+    for r, matches in enumerate(t.matchs, start=1):
+        for m_idx, (e1, e2) in enumerate(matches):
+            key = f"score_{r}_{m_idx}"
+            yield (key, r, m_idx + 1, *e1, *e2, *_score(t, key))
+
+def _lignes_poules(t):
+    for name, pfx in moteur.PREFIXES.items():
+        section = t.section(name)
+        teams = section["teams"]
+        for p_idx, pool in enumerate(section["pools"]):
+            for m_idx, (ti, tj) in enumerate(pool["matches"]):
+                key = f"{pfx['pool']}_{p_idx}_m_{m_idx}"
+                yield (key, name, p_idx + 1, m_idx + 1, *teams[ti], *teams[tj], *_score(t, key))
+
+def _lignes_tableaux(t):
+    finales = (("quarts", "rl_quart_{}"), ("demis", "rl_demi_{}"), ("finale", "rl_finale"))
+    for tour, (phase, modele) in enumerate(finales, start=1):
+        for m_idx, (A, B) in enumerate(t.finals.get(phase, [])):
+            key = modele.format(m_idx)
+            yield (key, "rounds_libres", "finales", tour, m_idx + 1, *A, *B, *_score(t, key))
+    for name, pfx in moteur.PREFIXES.items():
+        section = t.section(name)
+        teams = section["teams"]
+        for bracket in ("main_bracket", "cons_bracket"):
+            b = section[bracket]
+            if not b["arbre"]:
+                continue
+            for r_idx in range(1, moteur.tours_ouverts(b) + 1):
+                for m_idx, A, B in moteur.matchs_tour(b, r_idx):
+                    key = f"{pfx[bracket]}_r{r_idx}_m{m_idx}"
+                    yield (key, name, bracket, r_idx, m_idx + 1, *teams[A], *teams[B], *_score(t, key))
+
+_EQUIPES = [("H1", "str"), ("F1", "str"), ("H2", "str"), ("F2", "str"),
+            ("score", "str"), ("jeux1", "int"), ("jeux2", "int")]
+TABLES = {
+    "classement": ([("Rang", "int"), ("Joueur", "str"), ("Points", "float"), ("Jeux", "int"),
+                    ("Matchs", "int"), ("Sexe", "str")], _lignes_classement),
+    "rounds":     ([("match_id", "str"), ("round", "int"), ("match", "int")] + _EQUIPES, _lignes_rounds),
+    "poules":     ([("match_id", "str"), ("section", "str"), ("poule", "int"), ("match", "int")] + _EQUIPES,
+                   _lignes_poules),
+    "tableaux":   ([("match_id", "str"), ("section", "str"), ("tableau", "str"), ("tour", "int"),
+                    ("match", "int")] + _EQUIPES, _lignes_tableaux),
+}
+
+def _lots(lignes, taille):
+    lot = []
+    for row in lignes:
+        lot.append(row)
+        if len(lot) == taille:
+            yield lot; lot = []
+    if lot:
+        yield lot
+
+def exporter(t, table, flux, format="csv"):
+    """Écrit une table (voir TABLES) dans `flux` (fichier binaire) en CSV ou Parquet ;
+       renvoie le nombre de lignes. Parquet demande pyarrow (ValueError sinon)."""
+    colonnes, generer = TABLES[table]
+    noms = [c for c, _ in colonnes]
+    n = 0
+    if format == "csv":
+        texte = io.TextIOWrapper(flux, encoding="utf-8", newline="")
+        w = csv.writer(texte)
+        w.writerow(noms)
+        for row in generer(t):
+            w.writerow(row); n += 1
+        texte.flush(); texte.detach()
+        return n
+    if format != "parquet":
+        raise ValueError(f"Format inconnu : {format!r} (csv ou parquet).")
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Export Parquet indisponible : installer pyarrow (ou exporter en CSV).")
+    types = {"str": pa.string(), "int": pa.int64(), "float": pa.float64()}
+    schema = pa.schema([(c, types[ty]) for c, ty in colonnes])
+    with pq.ParquetWriter(flux, schema) as w:
+        for lot in _lots(generer(t), TAILLE_LOT):
+            w.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(col, type=schema.field(i).type) for i, col in enumerate(zip(*lot))], schema=schema))
+            n += len(lot)
+    return n
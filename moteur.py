@@ -0,0 +1,1273 @@
+# -*- coding: utf-8 -*-
+"""Moteur du tournoi de padel, sans Streamlit.
+
+Tout l'état vit dans un objet `Tournoi` explicite et les paramètres (terrains,
+max de matchs, roster...) sont passés en arguments : le moteur tourne (et se
+chronomètre) hors navigateur. `tournoi.py` n'est qu'une vue Streamlit dessus,
+`tournoi_cli.py` un pilote en ligne de commande.
+"""
+import bisect
+import heapq
+import random
+import time
+import uuid
+
+import numpy as np
+
+# =========================
+#   ÉTAT
+# =========================
+# Préfixes des clés de score par section (identiques aux clés des widgets Streamlit)
+PREFIXES = {
+    "poules":        {"pool": "pool",  "main_bracket": "main_bracket",        "cons_bracket": "cons_bracket"},
+    "poules_manual": {"pool": "mpool", "main_bracket": "manual_main_bracket", "cons_bracket": "manual_cons_bracket"},
+}
+
+def finals_vides():
+    return {"quarts": [], "demis": [], "finale": [], "vainqueur": None}
+
+def tableau_vide():
+    # arbre plat (voir construire_tableau) ; "valides" = nb de tours validés
+    return {"arbre": [], "valides": 0}
+
+def poules_vides(manual=False):
+    d = {
+        "params": {"nb_poules": 2, "teams_per_pool": 4},
+        "teams": [],          # liste de paires [(H,F), ...]
+        "pools": [],          # [{"teams":[ids], "matches":[(i,j),...], "tours":[[m_idx,...],...]}, ...]
+        "planning": None,     # créneaux × terrains des matchs de poule (voir planifier_poules)
+        "main_bracket": tableau_vide(),
+        "cons_bracket": tableau_vide(),
+    }
+    if manual:
+        d["selections"] = {}  # clés "pm_{p}_{s}_H"/"pm_{p}_{s}_F" pour les selectboxes
+    return d
+
+class TableJoueurs:
+    """Joueurs internés en indices entiers ; Points/Jeux/Matchs en tableaux NumPy contigus.
+       Un nom présent deux fois (ou dans les deux listes) garde sa première occurrence."""
+    def __init__(self, hommes=(), femmes=()):
+        self.noms = []; sexes = []
+        self.ids = {}            # {nom: indice}
+        for sexe, liste in (("H", hommes), ("F", femmes)):
+            for nom in liste:
+                if nom not in self.ids:
+                    self.ids[nom] = len(self.noms)
+                    self.noms.append(nom); sexes.append(sexe)
+        self.sexe   = np.array(sexes, dtype="U1")
+        self.points = np.zeros(len(self.noms), dtype=np.float64)
+        self.jeux   = np.zeros(len(self.noms), dtype=np.int64)
+        self.matchs = np.zeros(len(self.noms), dtype=np.int64)
+
+    def __len__(self): return len(self.noms)
+    def __iter__(self): return iter(self.noms)
+    def __contains__(self, nom): return nom in self.ids
+
+    def sexe_de(self, nom):
+        return self.sexe[self.ids[nom]]
+
+    def indices(self, noms):
+        """Noms → indices (-1 pour un joueur retiré du roster)."""
+        get = self.ids.get
+        return np.fromiter((get(n, -1) for n in noms), dtype=np.int64, count=len(noms))
+
+    def remettre_a_zero(self):
+        self.points[:] = 0.0; self.jeux[:] = 0; self.matchs[:] = 0
+
+class Registre:
+    """Noms internés en ids entiers stables (ajout seulement) : un joueur retiré du roster
+       garde son id, les rounds déjà planifiés restent valides."""
+    __slots__ = ("noms", "ids")
+    def __init__(self, noms=()):
+        self.noms = []; self.ids = {}
+        for nom in noms:
+            self.id(nom)
+
+    def id(self, nom):
+        i = self.ids.get(nom)
+        if i is None:
+            i = self.ids[nom] = len(self.noms)
+            self.noms.append(nom)
+        return i
+
+class RoundLibre:
+    """Vue sur les lignes d'un round de TableMatchs : se parcourt en ([H,F],[H,F]) de noms."""
+    __slots__ = ("table", "debut", "fin")
+    def __init__(self, table, debut, fin):
+        self.table = table; self.debut = debut; self.fin = fin
+
+    def __len__(self):
+        return self.fin - self.debut
+
+    def __iter__(self):
+        noms = self.table.registre.noms
+        for h1, f1, h2, f2 in self.table.ids[self.debut:self.fin].tolist():
+            yield [noms[h1], noms[f1]], [noms[h2], noms[f2]]
+
+    def __getitem__(self, m):
+        if not 0 <= m < len(self):
+            raise IndexError(m)
+        noms = self.table.registre.noms
+        h1, f1, h2, f2 = self.table.ids[self.debut + m].tolist()
+        return [noms[h1], noms[f1]], [noms[h2], noms[f2]]
+
+class TableMatchs:
+    """Rounds libres dans un seul tableau int32 : une ligne [h1, f1, h2, f2] d'ids du
+       registre par match, `debuts[r]` = première ligne du round r. Se parcourt et
+       s'allonge (append) comme l'ancienne liste de rounds."""
+    __slots__ = ("registre", "ids", "n", "debuts")
+    def __init__(self, registre):
+        self.registre = registre
+        self.ids = np.zeros((64, 4), dtype=np.int32)
+        self.n = 0               # lignes utilisées (capacité doublée à la demande)
+        self.debuts = []
+
+    def __len__(self):
+        return len(self.debuts)
+
+    def __getitem__(self, r):
+        if r < 0:
+            r += len(self.debuts)
+        if not 0 <= r < len(self.debuts):
+            raise IndexError(r)
+        fin = self.debuts[r+1] if r+1 < len(self.debuts) else self.n
+        return RoundLibre(self, self.debuts[r], fin)
+
+    def __iter__(self):
+        for r in range(len(self.debuts)):
+            yield self[r]
+
+    def append(self, matches):
+        """Nouveau round : [([H,F],[H,F]), ...] de noms."""
+        lignes = [[self.registre.id(x) for x in (*e1, *e2)] for e1, e2 in matches]
+        besoin = self.n + len(lignes)
+        if besoin > len(self.ids):
+            ids = np.zeros((max(besoin, 2 * len(self.ids)), 4), dtype=np.int32)
+            ids[:self.n] = self.ids[:self.n]
+            self.ids = ids
+        if lignes:
+            self.ids[self.n:besoin] = lignes
+        self.debuts.append(self.n)
+        self.n = besoin
+
+    def vers_dict(self):
+        return {"ids": self.ids[:self.n].ravel().tolist(), "debuts": self.debuts}
+
+    @classmethod
+    def depuis_dict(cls, registre, d):
+        table = cls(registre)
+        ids = np.asarray(d["ids"], dtype=np.int32).reshape(-1, 4)
+        table.ids = ids if len(ids) else table.ids
+        table.n = len(ids)
+        table.debuts = list(d["debuts"])
+        return table
+
+class Tournoi:
+    """État complet d'un tournoi (joueurs, rounds, phases finales, poules, scores saisis)."""
+    def __init__(self):
+        self.joueurs = TableJoueurs()
+        self.niveaux = {}        # {nom: niveau} facultatif (import de roster)
+        self.registre = Registre()
+        self.matchs = TableMatchs(self.registre)   # rounds libres (ids internés)
+        self.finals = finals_vides()
+        self.poules = poules_vides()
+        self.poules_manual = poules_vides(manual=True)
+        self.scores = {}         # {clé_score: saisie brute "6-4"}
+        # Registre des scores : {clé_score: (gagnants, perdants, s_g, s_p)}
+        # "dirty" force une reconstruction complète (changement de roster / de structure)
+        self.ledger = {"events": {}, "dirty": True}
+        self._index = None       # {clé_score: (e1, e2)}, reconstruit à la demande
+        self.stats_poules = {}   # {(section, p_idx): StatsPoule}, construites à la demande
+        self._cles_poules = {}   # {clé_score: (StatsPoule, m_idx)}
+        self._selections = None  # IndexSelections des poules manuelles
+        self._classement = None  # ClassementIncremental (Mexicano), construit à la demande
+        self.planif = None       # compteurs + tas du planificateur des rounds libres
+        self.rev = 0             # révision de structure (roster, rounds, poules, tableaux)
+        self.version = 0         # version des résultats : +1 à chaque saisie effective
+        self.reglages = 0        # +1 à chaque réglage hors structure (paramètres, sélections manuelles)
+        self.uid = uuid.uuid4().hex  # identifiant du tournoi (clés de cache entre sessions)
+
+    def section(self, name):
+        return self.poules if name == "poules" else self.poules_manual
+
+def structure_modifiee(t):
+    """Roster/rounds/poules/tableaux changés : index des matchs à refaire, révision +1."""
+    t._index = None
+    t.stats_poules = {}; t._cles_poules = {}
+    t.rev += 1
+
+# Version du format de vers_dict ; depuis_dict migre les états plus anciens (voir migrer_etat)
+FORMAT_ETAT = 3
+
+def vers_dict(t):
+    """État sérialisable en JSON (roster, structure, saisies) ; les agrégats se recalculent."""
+    tab = t.joueurs
+    return {
+        "format": FORMAT_ETAT,
+        "hommes": [n for n, x in zip(tab.noms, tab.sexe) if x == "H"],
+        "femmes": [n for n, x in zip(tab.noms, tab.sexe) if x == "F"],
+        "niveaux": t.niveaux,
+        "noms": t.registre.noms,
+        "matchs": t.matchs.vers_dict(),
+        "finals": t.finals,
+        "poules": t.poules,
+        "poules_manual": t.poules_manual,
+        "scores": t.scores,
+    }
+
+def format_etat(d):
+    """Version d'un état sauvegardé ; avant le champ "format", reconnue à sa forme :
+       1 = tableaux en listes de tours, 2 = tableaux en arbre, rounds et feuilles en noms,
+       3 = noms internés (identifiants)."""
+    if "format" in d:
+        return d["format"]
+    if any(isinstance(d[name][bracket], list) for name in PREFIXES for bracket in ("main_bracket", "cons_bracket")):
+        return 1
+    return 3 if isinstance(d["matchs"], dict) else 2
+
+def _arbre_depuis_tours(tours, prefixe, scores):
+    """Ancien tableau (liste de tours de (A, B), les gagnants de chaque tour tirés au sort
+       pour le suivant) → {"arbre", "valides"} ; les clés de score des matchs sont renommées
+       (dans `scores`) selon leur position dans l'arbre. ValueError si les tours ne forment
+       pas un arbre complet (nombre d'équipes qui n'est pas une puissance de 2)."""
+    if not tours:
+        return tableau_vide()
+    n = 2 * len(tours[0])
+    if n & (n - 1) or any(len(tour) != len(tours[0]) >> r for r, tour in enumerate(tours)):
+        raise ValueError(f"Tableau {prefixe} de {n} équipes : non convertible (il faut 4, 8, 16... équipes).")
+    # match de chaque équipe à chaque tour : {tuple(équipe): m_idx}
+    match_de = [{tuple(e): m for m, AB in enumerate(tour) for e in AB} for tour in tours]
+    arbre = [None] * (2 * n)
+    renommees = {}
+    def placer(i, r, m):      # match m du tour r (1 = premier tour) au nœud i de l'arbre
+        A, B = tours[r - 1][m]
+        arbre[2*i], arbre[2*i + 1] = list(A), list(B)
+        renommees[f"{prefixe}_r{r}_m{m}"] = f"{prefixe}_r{r}_m{i - (n >> r)}"
+        if r > 1:
+            for j, e in ((2*i, A), (2*i + 1, B)):
+                if tuple(e) not in match_de[r - 2]:
+                    raise ValueError(f"Tableau {prefixe} : {e} n'a pas joué le tour {r - 1}.")
+                placer(j, r - 1, match_de[r - 2][tuple(e)])
+    k = len(tours)
+    for m in range(len(tours[-1])):
+        placer((n >> k) + m, k, m)
+    anciennes = {cle: scores.pop(cle) for cle in renommees if cle in scores}
+    scores.update({renommees[cle]: raw for cle, raw in anciennes.items()})
+    return {"arbre": arbre, "valides": k - 1}
+
+def _migrer_1_2(d):
+    """Tableaux en listes de tours → arbres (feuilles en noms), clés de score renommées."""
+    for name, pfx in PREFIXES.items():
+        for bracket in ("main_bracket", "cons_bracket"):
+            d[name][bracket] = _arbre_depuis_tours(d[name][bracket], pfx[bracket], d["scores"])
+    return d
+
+def _migrer_2_3(d):
+    """Rounds en listes de noms → table d'ids ; feuilles des tableaux (équipes) → indices
+       dans section["teams"]."""
+    registre = Registre()
+    table = TableMatchs(registre)
+    for rnd in d["matchs"]:
+        table.append(rnd)
+    d["noms"] = registre.noms
+    d["matchs"] = table.vers_dict()
+    for name in PREFIXES:
+        section = d[name]
+        index = {tuple(e): i for i, e in enumerate(section["teams"])}
+        for bracket in ("main_bracket", "cons_bracket"):
+            b = section[bracket]
+            try:
+                b["arbre"] = [None if e is None else index[tuple(e)] for e in b["arbre"]]
+            except KeyError as e:
+                raise ValueError(f"Tableau {bracket} : équipe {e} absente des équipes de la section.")
+    return d
+
+MIGRATIONS = {1: _migrer_1_2, 2: _migrer_2_3}   # {format: étape vers format + 1}
+
+def migrer_etat(d):
+    """État d'un format antérieur → FORMAT_ETAT, étape par étape (d est modifié sur place).
+       ValueError si le format est inconnu ou plus récent que ce programme."""
+    v = format_etat(d)
+    if v > FORMAT_ETAT:
+        raise ValueError(f"Sauvegarde au format {v}, plus récent que ce programme (format {FORMAT_ETAT}).")
+    while v < FORMAT_ETAT:
+        if v not in MIGRATIONS:
+            raise ValueError(f"Sauvegarde au format {v} : migration impossible.")
+        d = MIGRATIONS[v](d)
+        v += 1
+    d["format"] = FORMAT_ETAT
+    return d
+
+def depuis_dict(d):
+    """Inverse de vers_dict (les équipes de poules redeviennent des tuples) ; un état d'un
+       format antérieur est d'abord migré (voir migrer_etat)."""
+    d = migrer_etat(d)
+    t = Tournoi()
+    sync_joueurs(t, d["hommes"], d["femmes"], d.get("niveaux"))
+    t.registre = Registre(d["noms"])
+    t.matchs = TableMatchs.depuis_dict(t.registre, d["matchs"])
+    t.finals = d["finals"]
+    t.finals["quarts"] = [(list(A), list(B)) for A, B in t.finals["quarts"]]
+    t.finals["demis"]  = [(list(A), list(B)) for A, B in t.finals["demis"]]
+    t.finals["finale"] = [(list(A), list(B)) for A, B in t.finals["finale"]]
+    for name in PREFIXES:
+        section = t.section(name)
+        section.update(d[name])
+        section["teams"] = [tuple(e) for e in section["teams"]]
+        for pool in section["pools"]:
+            pool["matches"] = [tuple(m) for m in pool["matches"]]
+    t.scores = dict(d["scores"])
+    return t
+
+def sync_joueurs(t, hommes, femmes, niveaux=None):
+    """Roster modifié → nouvelle table internée ; les agrégats seront reconstruits depuis les scores.
+       `niveaux` ({nom: niveau}) remplace les niveaux connus s'il est fourni."""
+    table = TableJoueurs(hommes, femmes)
+    if niveaux is not None:
+        t.niveaux = {n: float(v) for n, v in niveaux.items() if n in table}
+    if table.noms == t.joueurs.noms and np.array_equal(table.sexe, t.joueurs.sexe):
+        return False
+    t.joueurs = table
+    t.ledger["dirty"] = True
+    structure_modifiee(t)
+    return True
+
+# =========================
+#   OUTILS
+# =========================
+def add_points(players, s_g, s_p, gagnants, perdants, sens=1):
+    """Barème : Gagnant 3 + 0.1*jeux ; Perdant 0.5 + 0.1*jeux (MAJ jeux/matchs).
+       sens=-1 annule un résultat déjà compté ; joueurs retirés du roster ignorés."""
+    add_points_lot(players, [s_g], [s_p], [gagnants], [perdants], sens)
+
+def add_points_lot(players, s_g, s_p, gagnants, perdants, sens=1):
+    """Même barème pour un lot de m matchs en un seul scatter-add :
+       s_g/s_p de forme (m,), gagnants/perdants de forme (m, 2) (noms ou indices)."""
+    s_g = np.asarray(s_g, dtype=np.int64); s_p = np.asarray(s_p, dtype=np.int64)
+    if not len(s_g):
+        return
+    for equipes, jeux, base in ((gagnants, s_g, 3.0), (perdants, s_p, 0.5)):
+        idx = np.asarray(equipes)
+        if idx.dtype.kind not in "iu":
+            idx = players.indices(idx.ravel()).reshape(idx.shape)
+        jeux = np.broadcast_to(jeux[:, None], idx.shape)
+        ok = idx >= 0
+        idx = idx[ok]; jeux = jeux[ok]
+        np.add.at(players.points, idx, sens * (base + jeux * 0.1))
+        np.add.at(players.jeux,   idx, sens * jeux)
+        np.add.at(players.matchs, idx, sens)
+
+def parse_score(s):
+    try:
+        a,b = map(int, s.strip().split("-"))
+        return a,b
+    except Exception:
+        return None
+
+# =========================
+#   CLASSEMENT GLOBAL
+# =========================
+def iter_matchs_scores(t):
+    """Tous les matchs notables : (clé du score, équipe 1, équipe 2)."""
+    # 1) Rounds libres
+    for r, matches in enumerate(t.matchs, start=1):
+        for m_idx, (e1, e2) in enumerate(matches):
+            yield f"score_{r}_{m_idx}", e1, e2
+
+    # 2) Phases finales (Rounds libres)
+    for idx, (A,B) in enumerate(t.finals.get("quarts", [])):
+        yield f"rl_quart_{idx}", A, B
+    for idx, (A,B) in enumerate(t.finals.get("demis", [])):
+        yield f"rl_demi_{idx}", A, B
+    for A,B in t.finals.get("finale", []):
+        yield "rl_finale", A, B
+
+    # 3) Poules auto (+ tableaux), 4) Poules manuelles (+ tableaux)
+    for name, pfx in PREFIXES.items():
+        section = t.section(name)
+        teams = section.get("teams", [])
+        for p_idx, pool in enumerate(section.get("pools", [])):
+            for m_idx, (ti,tj) in enumerate(pool.get("matches", [])):
+                yield f"{pfx['pool']}_{p_idx}_m_{m_idx}", teams[ti], teams[tj]
+        for bracket in ("main_bracket", "cons_bracket"):
+            b = section[bracket]
+            for r_idx in range(1, tours_ouverts(b) + 1):
+                for m_idx, A, B in matchs_tour(b, r_idx):
+                    yield f"{pfx[bracket]}_r{r_idx}_m{m_idx}", teams[A], teams[B]
+
+def index_matchs(t):
+    if t._index is None:
+        t._index = {key: (e1, e2) for key, e1, e2 in iter_matchs_scores(t)}
+    return t._index
+
+def saisir_score(t, key, raw, e1=None, e2=None):
+    """Applique le delta d'un seul score : annule l'ancien résultat, compte le nouveau.
+       Renvoie False si la clé ne correspond à aucun match."""
+    if e1 is None:
+        teams = index_matchs(t).get(key)
+        if teams is None:
+            return False
+        e1, e2 = teams
+    raw = (raw or "").strip()
+    if t.scores.get(key, "") == raw:
+        return True
+    if raw: t.scores[key] = raw
+    else:   t.scores.pop(key, None)
+    t.version += 1
+    sc = parse_score(raw)
+    poule = t._cles_poules.get(key)
+    if poule:
+        poule[0].saisir(poule[1], sc)
+    events = t.ledger["events"]
+    old = events.pop(key, None)
+    if old:
+        g, p, s_g, s_p = old
+        add_points(t.joueurs, s_g, s_p, g, p, sens=-1)
+    if sc:
+        s1, s2 = sc
+        if s1 > s2: ev = (e1, e2, s1, s2)
+        else:       ev = (e2, e1, s2, s1)
+        events[key] = ev
+        add_points(t.joueurs, ev[2], ev[3], ev[0], ev[1])
+    if (old or sc) and t._classement is not None:
+        t._classement.replacer(t.joueurs.indices([*e1, *e2]).tolist())
+    return True
+
+def saisir_scores(t, items):
+    """Lot de (clé, saisie) : enregistre tout puis une seule reconstruction vectorisée.
+       Renvoie les clés qui ne correspondent à aucun match."""
+    index = index_matchs(t)
+    inconnues = []
+    for key, raw in items:
+        if key not in index:
+            inconnues.append(key); continue
+        raw = (raw or "").strip()
+        if raw: t.scores[key] = raw
+        else:   t.scores.pop(key, None)
+    t.version += 1
+    t.ledger["dirty"] = True
+    t.stats_poules = {}; t._cles_poules = {}
+    maj_classement_global(t)
+    return inconnues
+
+def invalider_classement(t, *prefixes):
+    """Structure modifiée : oublie les scores des clés concernées et force une reconstruction."""
+    for store in (t.ledger["events"], t.scores):
+        for key in list(store):
+            if prefixes and key.startswith(prefixes):
+                del store[key]
+    t.ledger["dirty"] = True
+    t.version += 1
+    structure_modifiee(t)
+
+def maj_classement_global(t):
+    """Reconstruction complète seulement si le registre est invalidé ;
+       sinon les agrégats sont déjà à jour (deltas appliqués par saisir_score)."""
+    if not t.ledger["dirty"]:
+        return
+    t._classement = None
+    t.joueurs.remettre_a_zero()
+    events = t.ledger["events"] = {}
+    for key, e1, e2 in iter_matchs_scores(t):
+        sc = parse_score(t.scores.get(key) or "")
+        if not sc: continue
+        s1, s2 = sc
+        events[key] = (e1, e2, s1, s2) if s1 > s2 else (e2, e1, s2, s1)
+    # tous les résultats appliqués en un seul lot
+    if events:
+        g, p, s_g, s_p = zip(*events.values())
+        add_points_lot(t.joueurs, s_g, s_p, g, p)
+    t.ledger["dirty"] = False
+
+def classement_colonnes(t):
+    """Colonnes du classement dans l'ordre (Points, Jeux) décroissants : un seul lexsort,
+       Points arrondis à 1 décimale (égalités départagées par l'ordre du roster)."""
+    maj_classement_global(t)
+    tab = t.joueurs
+    points = np.round(tab.points, 1)
+    ordre = np.lexsort((-tab.jeux, -points))
+    return {
+        "Joueur": np.asarray(tab.noms, dtype=object)[ordre],
+        "Points": points[ordre],
+        "Jeux":   tab.jeux[ordre],
+        "Matchs": tab.matchs[ordre],
+        "Sexe":   tab.sexe[ordre],
+    }
+
+class ClassementIncremental:
+    """Même ordre que classement_colonnes (Points à 1 décimale, Jeux décroissants, égalités
+       dans l'ordre du roster), entretenu par deltas : une saisie ne replace que ses 4 joueurs
+       (bisect) au lieu d'un tri complet avant chaque tirage Mexicano."""
+    __slots__ = ("table", "cles", "cle_de")
+    def __init__(self, table):
+        self.table = table
+        points = np.round(table.points, 1)
+        self.cle_de = list(zip((-points).tolist(), (-table.jeux).tolist(), range(len(table))))
+        self.cles = sorted(self.cle_de)
+
+    def _cle(self, i):
+        return (-float(np.round(self.table.points[i], 1)), -int(self.table.jeux[i]), i)
+
+    def replacer(self, indices):
+        for i in indices:
+            if i < 0:               # joueur retiré du roster
+                continue
+            old, new = self.cle_de[i], self._cle(i)
+            if new != old:
+                del self.cles[bisect.bisect_left(self.cles, old)]
+                bisect.insort(self.cles, new)
+                self.cle_de[i] = new
+
+    def ordre(self):
+        """Indices des joueurs du premier au dernier."""
+        return [c[2] for c in self.cles]
+
+def classement_incremental(t):
+    maj_classement_global(t)
+    if t._classement is None or t._classement.table is not t.joueurs:
+        t._classement = ClassementIncremental(t.joueurs)
+    return t._classement
+
+def classement(t):
+    """Lignes du classement triées (Points, Jeux) décroissants, Points à 1 décimale."""
+    cols = classement_colonnes(t)
+    return [dict(zip(cols, vals)) for vals in zip(*(c.tolist() for c in cols.values()))]
+
+def vainqueurs(t, keyed_matches):
+    """[(clé, A, B), ...] → gagnants dans l'ordre, ou None si un score manque."""
+    winners = []
+    for key, A, B in keyed_matches:
+        sc = parse_score(t.scores.get(key) or "")
+        if not sc: return None
+        s1, s2 = sc
+        winners.append(A if s1 > s2 else B)
+    return winners
+
+# =========================
+#   ROUNDS LIBRES
+# =========================
+def scheduled_counts_rounds(t):
+    """Matchs planifiés par joueur, entretenus d'un round à l'autre par generer_round ;
+       recalcul complet seulement si le roster ou la liste des rounds a changé ailleurs."""
+    p = t.planif
+    if p is None or p["roster"] is not t.joueurs or p["nb_rounds"] != len(t.matchs):
+        counts = {j: 0 for j in t.joueurs}
+        p = t.planif = {"roster": t.joueurs, "nb_rounds": len(t.matchs), "counts": counts,
+                        "max_matchs": None, "tas": None,
+                        # co-occurrences creuses {(a,b) trié: nb} pour le mode diversité
+                        "partenaires": {}, "adversaires": {}}
+        for rnd in t.matchs:
+            _compter_rencontres(p, rnd)
+            for e1,e2 in rnd:
+                for j in e1+e2:
+                    if j in counts:
+                        counts[j] += 1
+    return p["counts"]
+
+def _cle(a, b):
+    return (a, b) if a < b else (b, a)
+
+def _compter_rencontres(p, matches):
+    part = p["partenaires"]; adv = p["adversaires"]
+    for e1, e2 in matches:
+        for h, f in (e1, e2):
+            k = _cle(h, f); part[k] = part.get(k, 0) + 1
+        for a in e1:
+            for b in e2:
+                k = _cle(a, b); adv[k] = adv.get(k, 0) + 1
+
+def _tas_eligibles(t, max_matchs, rng=random):
+    """Tas-min (compte, tirage aléatoire, nom) par sexe des joueurs sous max_matchs."""
+    counts = scheduled_counts_rounds(t)
+    p = t.planif
+    if p["tas"] is None or p["max_matchs"] != max_matchs:
+        tas = {"H": [], "F": []}
+        for j, c in counts.items():
+            if c < max_matchs:
+                tas[t.joueurs.sexe_de(j)].append((c, rng.random(), j))
+        for heap in tas.values():
+            heapq.heapify(heap)
+        p["tas"] = tas; p["max_matchs"] = max_matchs
+    return p["tas"]
+
+def nb_eligibles(t, max_matchs):
+    """(hommes, femmes) encore sous max_matchs."""
+    tas = _tas_eligibles(t, max_matchs)
+    return len(tas["H"]), len(tas["F"])
+
+def _apparier_diversite(p, H, F, budget):
+    """Recherche locale à partir de l'appariement glouton (H[k], F[k]) :
+       1) échanges de partenaires qui réduisent les duos déjà joués,
+       2) échanges d'équipes entre terrains qui réduisent les adversaires déjà rencontrés.
+       Anytime : à l'échéance du budget (secondes) on garde la meilleure solution courante,
+       au pire exactement le glouton."""
+    deadline = time.perf_counter() + budget
+    part = p["partenaires"].get; adv = p["adversaires"].get
+    n = len(H); F = F[:]
+
+    def c_part(h, f): return part(_cle(h, f), 0)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(n):
+            for j in range(i+1, n):
+                d = (c_part(H[i], F[j]) + c_part(H[j], F[i])
+                     - c_part(H[i], F[i]) - c_part(H[j], F[j]))
+                if d < 0:
+                    F[i], F[j] = F[j], F[i]; improved = True
+            if time.perf_counter() >= deadline:
+                break
+
+    teams = list(zip(H, F))
+    def c_match(a, b):
+        return sum(adv(_cle(x, y), 0) for x in a for y in b)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(n):
+            for j in range(i+1, n):
+                mi, mj = i//2, j//2
+                if mi == mj: continue
+                oi = teams[i^1]; oj = teams[j^1]
+                d = (c_match(teams[j], oi) + c_match(teams[i], oj)
+                     - c_match(teams[i], oi) - c_match(teams[j], oj))
+                if d < 0:
+                    teams[i], teams[j] = teams[j], teams[i]; improved = True
+            if time.perf_counter() >= deadline:
+                break
+    return [(list(teams[2*k]), list(teams[2*k+1])) for k in range(n//2)]
+
+def _apparier_mexicano(t, H, F):
+    """Joueurs tirés classés par sexe selon le classement courant : le terrain k réunit les
+       hommes et les femmes de rangs 2k et 2k+1, le mieux classé des deux hommes avec la moins
+       bien classée des deux femmes (équivalent mixte du 1+4 contre 2+3)."""
+    cl = classement_incremental(t)
+    rang = lambda j: cl.cle_de[t.joueurs.ids[j]]
+    H = sorted(H, key=rang); F = sorted(F, key=rang)
+    return [([H[2*k], F[2*k+1]], [H[2*k+1], F[2*k]]) for k in range(len(H)//2)]
+
+def round_complet(t, r):
+    """Tous les scores du round r (1..n) sont saisis."""
+    return all(parse_score(t.scores.get(f"score_{r}_{i}") or "") for i in range(len(t.matchs[r-1])))
+
+# Formules des rounds : "libre" (tirage), "americano" (partenaires tournants : appariement
+# diversité imposé), "mexicano" (appariement selon le classement, un round à la fois).
+FORMULES = ("libre", "americano", "mexicano")
+
+def generer_round(t, nb_terrains, max_matchs, rng=random, diversite=False, budget=0.2, formule="libre"):
+    """Un round sur les joueurs les moins servis (garantie max_matchs).
+       diversite=True : mêmes joueurs, mais appariés pour limiter partenaires et adversaires
+       répétés, dans la limite de `budget` secondes (toujours le cas en americano).
+       formule="mexicano" : ValueError tant que le round précédent n'est pas complet."""
+    if formule not in FORMULES:
+        raise ValueError(f"Formule inconnue : {formule!r}.")
+    if formule == "mexicano" and t.matchs and not round_complet(t, len(t.matchs)):
+        raise ValueError(f"Round {len(t.matchs)} incomplet : le tirage Mexicano se fait sur le classement à jour.")
+    counts = scheduled_counts_rounds(t)
+    tas = _tas_eligibles(t, max_matchs, rng)
+    terrains = min(nb_terrains, len(tas["H"])//2, len(tas["F"])//2)
+    if terrains <= 0:
+        return False, 0
+
+    # les moins servis d'abord ; réinsertion seulement après le round (pas deux fois dans le même)
+    tires = {}
+    for sexe, heap in tas.items():
+        tires[sexe] = [heapq.heappop(heap)[2] for _ in range(2*terrains)]
+    H, F = tires["H"], tires["F"]
+    if formule == "mexicano":
+        matches = _apparier_mexicano(t, H, F)
+    elif diversite or formule == "americano":
+        matches = _apparier_diversite(t.planif, H, F, budget)
+    else:
+        matches = [([H[2*i],F[2*i]],[H[2*i+1],F[2*i+1]]) for i in range(terrains)]
+    _compter_rencontres(t.planif, matches)
+
+    for sexe, joueurs in tires.items():
+        for j in joueurs:
+            counts[j] += 1
+            if counts[j] < max_matchs:
+                heapq.heappush(tas[sexe], (counts[j], rng.random(), j))
+    t.matchs.append(matches)
+    t.planif["nb_rounds"] = len(t.matchs)
+    structure_modifiee(t)
+    return True, len(matches)
+
+def generer_tous_rounds(t, nb_terrains, max_matchs, rng=random, diversite=False, budget=0.2, formule="libre"):
+    if formule == "mexicano":
+        raise ValueError("Mexicano : un round à la fois (chaque tirage dépend des résultats du précédent).")
+    n = 0
+    while True:
+        ok, nb = generer_round(t, nb_terrains, max_matchs, rng, diversite, budget, formule)
+        if not ok or nb==0:
+            break
+        n += 1
+    return n
+
+# ===== Phases finales (Rounds libres) =====
+def generate_quarts_from_top8(t, rows, rng=random):
+    """Top8 H + Top8 F → 4 quarts aléatoires H+F vs H+F (croisement 0..3 avec 4..7).
+       `rows` = classement(t) ; ValueError si moins de 8 H ou 8 F."""
+    Hq = [r["Joueur"] for r in rows if r["Sexe"]=="H"][:8]
+    Fq = [r["Joueur"] for r in rows if r["Sexe"]=="F"][:8]
+    if len(Hq) < 8 or len(Fq) < 8:
+        raise ValueError(f"Il faut au moins 8 hommes ET 8 femmes dans le classement (actuellement {len(Hq)}H / {len(Fq)}F).")
+    rng.shuffle(Hq); rng.shuffle(Fq)
+    quarts = []
+    for i in range(4):
+        quarts.append(([Hq[i], Fq[i]], [Hq[i+4], Fq[i+4]]))
+    invalider_classement(t, "rl_")
+    t.finals["quarts"] = quarts
+    t.finals["demis"]  = []
+    t.finals["finale"] = []
+    t.finals["vainqueur"] = None
+
+def recomposer_paires(winners, rng=random):
+    """Recompose N paires gagnantes H+F en N nouvelles paires sans aucun duo H-F déjà joué.
+       Ordre tiré au sort puis décalage circulaire des F (dérangement) : toujours valide
+       dès N>=2 avec des joueurs distincts. ValueError si N<2 ou si un joueur apparaît
+       dans plusieurs paires (un tableau réel n'en produit jamais)."""
+    H = [t[0] for t in winners]
+    F = [t[1] for t in winners]
+    n = len(H)
+    if n < 2:
+        raise ValueError(f"Impossible de recomposer {n} paire(s) sans reformer un duo.")
+    if len(set(H)) < n or len(set(F)) < n:
+        raise ValueError("Un même joueur figure dans plusieurs paires gagnantes.")
+    ordre = list(range(n)); rng.shuffle(ordre)
+    return [(H[ordre[i]], F[ordre[(i+1) % n]]) for i in range(n)]
+
+def recomposed_semis_from_quarters_winners(winners, rng=random):
+    """Recompose les gagnants (H séparés et F séparées) en nouvelles paires H+F,
+       sans reproduire les **mêmes duos H-F**, puis les oppose deux à deux.
+       Valable pour 4, 8, 16, 32... équipes gagnantes ; ValueError si infaisable."""
+    if len(winners) % 2:
+        raise ValueError(f"Nombre impair d'équipes gagnantes ({len(winners)}).")
+    pairs = recomposer_paires(winners, rng)
+    rng.shuffle(pairs)
+    return [ (list(pairs[i]), list(pairs[i+1])) for i in range(0, len(pairs), 2) ]
+
+def valider_quarts(t, rng=random):
+    """Quarts complets → demi-finales recomposées. False si un score manque,
+       ValueError si la recomposition est infaisable."""
+    winners = vainqueurs(t, [(f"rl_quart_{idx}", A, B) for idx,(A,B) in enumerate(t.finals["quarts"])])
+    if not winners or len(winners)!=4:
+        return False
+    demis = recomposed_semis_from_quarters_winners(winners, rng)
+    invalider_classement(t, "rl_demi_", "rl_finale")
+    t.finals["demis"] = demis
+    return True
+
+def valider_demis(t, rng=random):
+    """Demis complètes → finale. False si un score manque."""
+    winners = vainqueurs(t, [(f"rl_demi_{idx}", A, B) for idx,(A,B) in enumerate(t.finals["demis"])])
+    if not winners or len(winners)!=2:
+        return False
+    rng.shuffle(winners)
+    invalider_classement(t, "rl_finale")
+    t.finals["finale"] = [(winners[0], winners[1])]
+    return True
+
+def declarer_vainqueur(t):
+    winners = vainqueurs(t, [("rl_finale", A, B) for A,B in t.finals["finale"][:1]])
+    if not winners:
+        return None
+    t.finals["vainqueur"] = winners[0]
+    structure_modifiee(t)
+    return winners[0]
+
+def reset_finals(t):
+    t.finals = finals_vides()
+    invalider_classement(t, "rl_")
+
+# =========================
+#   POULES + ÉLIMINATION
+# =========================
+def make_pairs_for_pools(hommes, femmes, nb_pairs, rng=random):
+    H = hommes[:]; F = femmes[:]
+    rng.shuffle(H); rng.shuffle(F)
+    nb = min(len(H), len(F), nb_pairs)
+    return [(H[i],F[i]) for i in range(nb)]
+
+def _niveau_defaut(niveaux):
+    """Niveau prêté aux joueurs sans niveau : moyenne des niveaux connus (0 s'il n'y en a aucun)."""
+    return sum(niveaux.values()) / len(niveaux) if niveaux else 0.0
+
+def equilibrer_poules(hommes, femmes, niveaux, nb_poules, tpp, rng=random, budget=0.2):
+    """Paires H+F réparties en poules de force homogène ; renvoie les équipes poule par poule
+       (tpp équipes consécutives par poule, l'ordre attendu par _installer_poules).
+       Joueurs retenus au sort comme make_pairs_for_pools, puis :
+       1) paires : le meilleur homme avec la moins bonne femme (forces d'équipe resserrées),
+       2) serpentin : équipes par force décroissante, poules 0..P-1 puis P-1..0...,
+       3) recherche locale : le meilleur échange d'équipes entre deux poules qui réduit la
+          variance des forces de poule, jusqu'à plus d'amélioration ou `budget` secondes."""
+    nb = nb_poules * tpp
+    H = hommes[:]; F = femmes[:]
+    rng.shuffle(H); rng.shuffle(F)
+    defaut = _niveau_defaut(niveaux)
+    niv = lambda n: niveaux.get(n, defaut)
+    H = sorted(H[:nb], key=niv, reverse=True); F = sorted(F[:nb], key=niv)
+    teams = list(zip(H, F))
+    force = np.array([niv(h) + niv(f) for h, f in teams], dtype=np.float64)
+
+    poules = [[] for _ in range(nb_poules)]
+    for rang, i in enumerate(np.argsort(-force, kind="stable").tolist()):
+        tour, pos = divmod(rang, nb_poules)
+        poules[pos if tour % 2 == 0 else nb_poules - 1 - pos].append(i)
+
+    P = np.array(poules, dtype=np.int64).reshape(nb_poules, -1)
+    S = force[P].sum(axis=1)
+    deadline = time.perf_counter() + budget
+    while time.perf_counter() < deadline:
+        meilleur, echange = -1e-9, None
+        for a in range(nb_poules):
+            fa = force[P[a]][:, None]
+            for b in range(a+1, nb_poules):
+                # d[i,j] : échange P[a,i] ↔ P[b,j] ; Sa²+Sb² varie de 2·d·(Sa − Sb + d)
+                d = force[P[b]][None, :] - fa
+                gain = d * (S[a] - S[b] + d)
+                k = int(np.argmin(gain))
+                if gain.flat[k] < meilleur:
+                    meilleur, echange = gain.flat[k], (a, b, *divmod(k, P.shape[1]))
+        if echange is None:
+            break
+        a, b, i, j = echange
+        P[a, i], P[b, j] = P[b, j], P[a, i]
+        d = force[P[a, i]] - force[P[b, j]]
+        S[a] += d; S[b] -= d
+    return [teams[i] for i in P.ravel().tolist()]
+
+def forces_poules(t, name):
+    """Force moyenne (niveau H + niveau F) des équipes de chaque poule ; None sans aucun niveau."""
+    if not t.niveaux:
+        return None
+    defaut = _niveau_defaut(t.niveaux)
+    section = t.section(name)
+    teams = section["teams"]
+    return [sum(t.niveaux.get(h, defaut) + t.niveaux.get(f, defaut) for h, f in (teams[i] for i in pool["teams"]))
+            / len(pool["teams"]) for pool in section["pools"]]
+
+def round_robin_tours(n):
+    """Round-robin (méthode du cercle) tour par tour : [[(a,b), ...], ...] ;
+       une équipe joue au plus une fois par tour (exempte si n est impair)."""
+    idxs = list(range(n))
+    if n % 2 == 1:
+        idxs.append(None); n += 1
+    half = n//2
+    schedule=[]; rows=idxs[:]
+    for _ in range(n-1):
+        pairings=[]
+        for i in range(half):
+            a = rows[i]; b = rows[n-1-i]
+            if a is not None and b is not None:
+                pairings.append((a,b))
+        rows = [rows[0]] + [rows[-1]] + rows[1:-1]
+        schedule.append(pairings)
+    return schedule
+
+def round_robin_indices(n):
+    return [m for tour in round_robin_tours(n) for m in tour]
+
+def _installer_poules(t, name, teams):
+    section = t.section(name)
+    nb_p = section["params"]["nb_poules"]
+    tpp  = section["params"]["teams_per_pool"]
+    section["teams"] = teams
+    pools=[]
+    all_ids=list(range(nb_p * tpp))
+    for p in range(nb_p):
+        pool_ids = all_ids[p*tpp:(p+1)*tpp]
+        matches=[]; tours=[]
+        for tour in round_robin_tours(tpp):
+            tours.append(list(range(len(matches), len(matches)+len(tour))))
+            matches += [(pool_ids[a], pool_ids[b]) for (a,b) in tour]
+        pools.append({"teams": pool_ids, "matches": matches, "tours": tours})
+    pfx = PREFIXES[name]
+    invalider_classement(t, pfx["pool"] + "_", pfx["main_bracket"] + "_r", pfx["cons_bracket"] + "_r")
+    section["pools"]=pools
+    section["planning"]=None
+    section["main_bracket"]=tableau_vide()
+    section["cons_bracket"]=tableau_vide()
+
+def build_pools(t, hommes, femmes, rng=random, equilibre=False, budget=0.2):
+    """Paires H+F tirées au sort puis poules en round-robin ; equilibre=True : paires et poules
+       de force homogène selon t.niveaux (voir equilibrer_poules). ValueError si pas assez de joueurs."""
+    nb_p = t.poules["params"]["nb_poules"]
+    tpp  = t.poules["params"]["teams_per_pool"]
+    total_needed = nb_p * tpp
+    if min(len(hommes), len(femmes)) < total_needed:
+        raise ValueError(f"Pas assez de joueurs pour {nb_p} poule(s) de {tpp} équipes (il faut {total_needed} paires H+F).")
+    if equilibre:
+        teams = equilibrer_poules(hommes, femmes, t.niveaux, nb_p, tpp, rng, budget)
+    else:
+        teams = make_pairs_for_pools(hommes, femmes, total_needed, rng)
+    _installer_poules(t, "poules", teams)
+
+def build_pools_manual(t):
+    """Construit les poules à partir des sélections manuelles H/F. ValueError si incomplet."""
+    pm = t.poules_manual
+    nb_p = pm["params"]["nb_poules"]
+    tpp  = pm["params"]["teams_per_pool"]
+    total_needed = nb_p * tpp
+
+    # Lire sélections
+    sels = pm["selections"]
+    pairs = []
+    for p in range(nb_p):
+        for s in range(tpp):
+            h = sels.get(f"pm_{p}_{s}_H", "")
+            f = sels.get(f"pm_{p}_{s}_F", "")
+            if h and f:
+                pairs.append((h,f))
+
+    if len(pairs) != total_needed:
+        raise ValueError(f"Il faut définir **exactement {total_needed}** équipes (1 H + 1 F).")
+    _installer_poules(t, "poules_manual", pairs)
+
+class IndexSelections:
+    """Joueurs pris / libres des selectboxes des poules manuelles, par sexe :
+       `libres` = indices du roster triés (bisect), `pris` = {nom: clé du slot}.
+       Construit une fois, puis mis à jour slot par slot par `choisir`."""
+    def __init__(self, t):
+        pm = t.poules_manual
+        self.tab = t.joueurs
+        self.sels = pm["selections"]
+        self.params = (pm["params"]["nb_poules"], pm["params"]["teams_per_pool"])
+        self.pris = {"H": {}, "F": {}}
+        nb_p, tpp = self.params
+        for p in range(nb_p):
+            for s in range(tpp):
+                for sexe in "HF":
+                    key = f"pm_{p}_{s}_{sexe}"
+                    nom = self.sels.get(key, "")
+                    if nom in self.tab and self.tab.sexe_de(nom) == sexe:
+                        self.pris[sexe].setdefault(nom, key)
+        self.libres = {sexe: [i for i, (nom, x) in enumerate(zip(self.tab.noms, self.tab.sexe))
+                              if x == sexe and nom not in self.pris[sexe]] for sexe in "HF"}
+
+    def valide(self, t):
+        pm = t.poules_manual
+        return (self.tab is t.joueurs and self.sels is pm["selections"]
+                and self.params == (pm["params"]["nb_poules"], pm["params"]["teams_per_pool"]))
+
+    def options(self, key):
+        """Joueurs libres (ordre du roster) + le choix actuel du slot à sa place."""
+        sexe = key[-1]
+        noms = self.tab.noms; libres = self.libres[sexe]
+        cur = self.sels.get(key, "")
+        if cur and self.pris[sexe].get(cur) == key:
+            k = bisect.bisect_left(libres, self.tab.ids[cur])
+            return [noms[i] for i in libres[:k]] + [cur] + [noms[i] for i in libres[k:]]
+        return [noms[i] for i in libres]
+
+    def choisir(self, key, nom):
+        """Affecte `nom` au slot `key` ; False si rien n'a changé."""
+        sexe = key[-1]
+        pris = self.pris[sexe]; libres = self.libres[sexe]
+        old = self.sels.get(key, "")
+        if old == nom:
+            return False
+        if old and pris.get(old) == key:
+            del pris[old]
+            bisect.insort(libres, self.tab.ids[old])
+        if nom and nom not in pris and nom in self.tab:
+            pris[nom] = key
+            i = self.tab.ids[nom]
+            k = bisect.bisect_left(libres, i)
+            if k < len(libres) and libres[k] == i:
+                del libres[k]
+        self.sels[key] = nom
+        return True
+
+def index_selections(t):
+    """Index des sélections manuelles, reconstruit si le roster, les sélections ou les
+       dimensions des poules ont changé."""
+    if t._selections is None or not t._selections.valide(t):
+        t._selections = IndexSelections(t)
+    return t._selections
+
+def choisir_selection(t, key, nom):
+    """Sélection manuelle d'un slot ; compte comme réglage à sauvegarder."""
+    if index_selections(t).choisir(key, nom):
+        t.reglages += 1
+
+def regler_poules(t, name, nb_poules, teams_per_pool):
+    """Dimensions des poules d'une section ; compte comme réglage à sauvegarder si elles changent."""
+    params = t.section(name)["params"]
+    if (params["nb_poules"], params["teams_per_pool"]) != (nb_poules, teams_per_pool):
+        params.update(nb_poules=nb_poules, teams_per_pool=teams_per_pool)
+        t.reglages += 1
+
+def reset_poules_manual(t):
+    pm = t.poules_manual
+    pm["selections"]={}
+    pm["teams"]=[]; pm["pools"]=[]; pm["planning"]=None
+    pm["main_bracket"]=tableau_vide(); pm["cons_bracket"]=tableau_vide()
+    pfx = PREFIXES["poules_manual"]
+    invalider_classement(t, pfx["pool"] + "_", pfx["main_bracket"] + "_r", pfx["cons_bracket"] + "_r")
+
+# ===== Planning des terrains (poules) =====
+def _tours_poule(pool):
+    """Tours du round-robin en indices de matchs (recalculés pour un état sans "tours")."""
+    if pool.get("tours"):
+        return pool["tours"]
+    tours = []; k = 0
+    for tour in round_robin_tours(len(pool["teams"])):
+        tours.append(list(range(k, k+len(tour)))); k += len(tour)
+    return tours
+
+def _verifier_terrains(nb_terrains):
+    if nb_terrains < 1:
+        raise ValueError(f"Il faut au moins un terrain (reçu {nb_terrains}).")
+
+def borne_creneaux(pools, nb_terrains):
+    """Minorant du nombre de créneaux : terrains saturés, ou poule la plus longue (un tour par créneau)."""
+    _verifier_terrains(nb_terrains)
+    total = sum(len(pool["matches"]) for pool in pools)
+    return max([-(-total // nb_terrains)] + [len(_tours_poule(pool)) for pool in pools])
+
+def planifier_creneaux(pools, nb_terrains, max_consecutifs=2):
+    """Affecte chaque match de poule à un créneau (liste de ≤ nb_terrains (p_idx, m_idx)).
+       Glouton par créneau : les poules au plus long reste passent d'abord, un match à la
+       fois par poule, dans l'ordre des tours ; une équipe joue au plus une fois par
+       créneau et au plus `max_consecutifs` créneaux d'affilée (0 = pas de limite).
+       ValueError si nb_terrains < 1."""
+    _verifier_terrains(nb_terrains)
+    en_attente = [[m for tour in _tours_poule(pool) for m in tour] for pool in pools]
+    par_creneau = [max(1, len(pool["teams"]) // 2) for pool in pools]
+    enchaines = {}           # {équipe: créneaux consécutifs joués jusqu'au précédent}
+    creneaux = []
+    reste = sum(map(len, en_attente))
+    while reste:
+        ordre = sorted((p for p in range(len(pools)) if en_attente[p]),
+                       key=lambda p: -(-len(en_attente[p]) // par_creneau[p]), reverse=True)
+        occupees = set(); creneau = []
+        ajoute = True
+        while ajoute and len(creneau) < nb_terrains:
+            ajoute = False
+            for p in ordre:
+                matches = pools[p]["matches"]
+                for k, m in enumerate(en_attente[p]):
+                    ti, tj = matches[m]
+                    if ti in occupees or tj in occupees:
+                        continue
+                    if max_consecutifs and max(enchaines.get(ti, 0), enchaines.get(tj, 0)) >= max_consecutifs:
+                        continue
+                    creneau.append((p, m)); occupees.update((ti, tj))
+                    del en_attente[p][k]
+                    ajoute = True
+                    break
+                if len(creneau) == nb_terrains:
+                    break
+        # un créneau vide (toutes les équipes restantes à leur limite) sert de pause
+        enchaines = {e: enchaines.get(e, 0) + 1 for e in occupees}
+        creneaux.append(creneau)
+        reste -= len(creneau)
+    return creneaux
+
+def planifier_poules(t, name, nb_terrains, max_consecutifs=2):
+    """Planning des matchs de poule sur les terrains, enregistré dans la section."""
+    section = t.section(name)
+    creneaux = planifier_creneaux(section["pools"], nb_terrains, max_consecutifs)
+    section["planning"] = {"terrains": nb_terrains, "max_consecutifs": max_consecutifs,
+                           "borne": borne_creneaux(section["pools"], nb_terrains),
+                           "creneaux": [[list(x) for x in c] for c in creneaux]}
+    structure_modifiee(t)
+    return section["planning"]
+
+class StatsPoule:
+    """Cumuls d'une poule indexés par position d'équipe (listes plates), mis à jour par delta
+       à chaque saisie ; le tri et les départages ne sont calculés qu'à la lecture."""
+    def __init__(self, teams, matches):
+        self.teams = list(teams)
+        self.pos = {ti: k for k, ti in enumerate(self.teams)}
+        self.matches = [(self.pos[ti], self.pos[tj]) for ti, tj in matches]
+        n = len(self.teams)
+        self.pts = [0.0] * n; self.jeux = [0] * n; self.contre = [0] * n
+        self.resultats = {}      # {m_idx: (s1, s2)}
+
+    def _appliquer(self, m_idx, sc, sens):
+        a, b = self.matches[m_idx]
+        s1, s2 = sc
+        if s1 > s2: self.pts[a] += sens * (3.0 + s1*0.1); self.pts[b] += sens * (0.5 + s2*0.1)
+        else:       self.pts[b] += sens * (3.0 + s2*0.1); self.pts[a] += sens * (0.5 + s1*0.1)
+        self.jeux[a] += sens * s1; self.contre[a] += sens * s2
+        self.jeux[b] += sens * s2; self.contre[b] += sens * s1
+
+    def saisir(self, m_idx, sc):
+        """sc = (s1, s2) ou None (score effacé / invalide)."""
+        old = self.resultats.pop(m_idx, None)
+        if old: self._appliquer(m_idx, old, -1)
+        if sc:
+            self.resultats[m_idx] = sc
+            self._appliquer(m_idx, sc, 1)
+
+    def _confrontations(self, groupe):
+        """Points gagnés dans les seuls matchs entre équipes du groupe (même barème)."""
+        dans = set(groupe)
+        pts = dict.fromkeys(groupe, 0.0)
+        for m_idx, (s1, s2) in self.resultats.items():
+            a, b = self.matches[m_idx]
+            if a in dans and b in dans:
+                if s1 > s2: pts[a] += 3.0 + s1*0.1; pts[b] += 0.5 + s2*0.1
+                else:       pts[b] += 3.0 + s2*0.1; pts[a] += 0.5 + s1*0.1
+        return pts
+
+    def classement(self):
+        """[{"team", "Pts", "Jeux", "Diff"}, ...] : Pts (à 1 décimale), puis confrontations
+           directes entre ex aequo, différence de jeux, jeux marqués, ordre de la poule."""
+        pts = [round(x, 1) for x in self.pts]
+        ordre = sorted(range(len(self.teams)), key=lambda k: -pts[k])
+        res = []
+        i = 0
+        while i < len(ordre):
+            j = i + 1
+            while j < len(ordre) and pts[ordre[j]] == pts[ordre[i]]:
+                j += 1
+            groupe = ordre[i:j]
+            if len(groupe) > 1:
+                h2h = self._confrontations(groupe)
+                groupe.sort(key=lambda k: (-round(h2h[k], 1), self.contre[k] - self.jeux[k], -self.jeux[k]))
+            res += groupe
+            i = j
+        return [{"team": self.teams[k], "Pts": pts[k], "Jeux": self.jeux[k],
+                 "Diff": self.jeux[k] - self.contre[k]} for k in res]
+
+def stats_poule(t, name, p_idx):
+    """StatsPoule de la poule, construite depuis les saisies au premier accès puis
+       entretenue par saisir_score ; oubliée à chaque changement de structure."""
+    sp = t.stats_poules.get((name, p_idx))
+    if sp is None:
+        pool = t.section(name)["pools"][p_idx]
+        prefix = PREFIXES[name]["pool"]
+        sp = t.stats_poules[(name, p_idx)] = StatsPoule(pool["teams"], pool["matches"])
+        for m_idx in range(len(pool["matches"])):
+            key = f"{prefix}_{p_idx}_m_{m_idx}"
+            t._cles_poules[key] = (sp, m_idx)
+            sp.saisir(m_idx, parse_score(t.scores.get(key) or ""))
+    return sp
+
+def classement_poule(t, name, p_idx):
+    """Classement interne d'une poule (voir StatsPoule.classement)."""
+    return stats_poule(t, name, p_idx).classement()
+
+# =========================
+#   TABLEAUX À ÉLIMINATION DIRECTE
+# =========================
+# Arbre plat façon tas d'indices d'équipes (section["teams"]), N = puissance de 2 ≥ nb d'équipes :
+# feuilles arbre[N:2N] (None = exempt),
+# nœud i = vainqueur du match entre arbre[2i] et arbre[2i+1], arbre[1] = champion.
+# Tour r = nœuds [N>>r, N>>(r-1)) ; le match m du tour r est le nœud (N>>r) + m.
+def ordre_tetes_de_serie(n):
+    """Têtes de série (1..n, n puissance de 2) dans l'ordre des feuilles : 1 et 2 ne
+       se croisent qu'en finale, la tête k affronte n+1-k au premier tour."""
+    ordre = [1]
+    while len(ordre) < n:
+        m = 2 * len(ordre) + 1
+        ordre = [x for s in ordre for x in (s, m - s)]
+    return ordre
+
+def _croiser_poules(arbre, n, rang, poule_de):
+    """Premier tour sans deux équipes d'une même poule : la moins bien classée d'un tel match
+       (feuille impaire) est échangée avec celle d'un autre match, au rang le plus proche, si
+       l'échange ne crée pas de nouveau conflit (croisement A1–B2, B1–A2)."""
+    for i in range(n // 2, n):
+        A, B = arbre[2*i], arbre[2*i + 1]
+        if A is None or B is None or poule_de[A] != poule_de[B]:
+            continue
+        autres = sorted((j for j in range(n // 2, n) if j != i and arbre[2*j] is not None and arbre[2*j + 1] is not None),
+                        key=lambda j: abs(rang[arbre[2*j + 1]] - rang[B]))
+        for j in autres:
+            C, D = arbre[2*j], arbre[2*j + 1]
+            if poule_de[D] != poule_de[A] and poule_de[B] != poule_de[C]:
+                arbre[2*i + 1], arbre[2*j + 1] = D, B
+                break
+
+def construire_tableau(equipes, poule_de=None):
+    """Équipes classées (tête de série 1 en premier) → tableau ; les exempts du premier
+       tour (taille non puissance de 2) reviennent aux meilleures têtes de série.
+       `poule_de` ({équipe: poule}) : pas de revanche de poule au premier tour si possible."""
+    n = 2
+    while n < len(equipes):
+        n *= 2
+    arbre = [None] * (2 * n)
+    for k, seed in enumerate(ordre_tetes_de_serie(n)):
+        if seed <= len(equipes):
+            arbre[n + k] = equipes[seed - 1]
+    if poule_de:
+        _croiser_poules(arbre, n, {e: k for k, e in enumerate(equipes)}, poule_de)
+    for i in range(n // 2, n):      # exempts : qualifiés d'office
+        A, B = arbre[2*i], arbre[2*i + 1]
+        if A is None or B is None:
+            arbre[i] = A if B is None else B
+    return {"arbre": arbre, "valides": 0}
+
+def nb_tours(b):
+    return (len(b["arbre"]) // 2).bit_length() - 1
+
+def tours_ouverts(b):
+    """Tours affichés : ceux déjà validés + le tour en cours (s'il en reste un)."""
+    return min(b["valides"] + 1, nb_tours(b))
+
+def matchs_tour(b, r_idx):
+    """(m_idx, A, B) des vrais matchs du tour r_idx, A et B indices d'équipes
+       (les exempts n'ont pas de match)."""
+    arbre = b["arbre"]
+    debut = (len(arbre) // 2) >> r_idx
+    for i in range(debut, 2 * debut):
+        A, B = arbre[2*i], arbre[2*i + 1]
+        if A is not None and B is not None:
+            yield i - debut, A, B
+
+def champion(b):
+    return b["arbre"][1] if b["arbre"] and b["valides"] == nb_tours(b) else None
+
+def candidats_tableaux(t, name):
+    """Top 2 de chaque poule → principal ; 3e et 4e → consolante, en indices d'équipes.
+       Listes classées par tête de série : tous les 1ers, puis les 2es (resp. 3es, 4es), chaque rang
+       départagé entre poules par (Pts, Diff, Jeux)."""
+    section = t.section(name)
+    par_rang = [[] for _ in range(4)]
+    for p_idx in range(len(section["pools"])):
+        scs = classement_poule(t, name, p_idx)
+        for rang, d in enumerate(scs[:4] if len(scs)>=4 else scs[:2]):
+            par_rang[rang].append(d)
+    cle = lambda d: (-d["Pts"], -d["Diff"], -d["Jeux"])
+    seeds = [[d["team"] for d in sorted(rang, key=cle)] for rang in par_rang]
+    return seeds[0] + seeds[1], seeds[2] + seeds[3]
+
+def generer_tableaux(t, name):
+    """Tableaux principal et consolante placés par tête de série (voir candidats_tableaux),
+       premiers tours croisés entre poules."""
+    section = t.section(name)
+    pfx = PREFIXES[name]
+    invalider_classement(t, pfx["main_bracket"] + "_r", pfx["cons_bracket"] + "_r")
+    main_candidates, cons_candidates = candidats_tableaux(t, name)
+    poule_de = {ti: p_idx for p_idx, pool in enumerate(section["pools"]) for ti in pool["teams"]}
+    for bracket, candidates in (("main_bracket", main_candidates), ("cons_bracket", cons_candidates)):
+        section[bracket] = construire_tableau(candidates, poule_de) if len(candidates)>=4 else tableau_vide()
+
+def reset_tableaux(t, name):
+    section = t.section(name)
+    pfx = PREFIXES[name]
+    section["main_bracket"]=tableau_vide()
+    section["cons_bracket"]=tableau_vide()
+    invalider_classement(t, pfx["main_bracket"] + "_r", pfx["cons_bracket"] + "_r")
+
+def valider_tour(t, name, bracket_name):
+    """Tour en cours complet → chaque vainqueur monte dans son nœud parent (O(1) par match),
+       ce qui ouvre le tour suivant ; la finale désigne le champion. False si incomplet."""
+    b = t.section(name)[bracket_name]
+    key_prefix = PREFIXES[name][bracket_name]
+    r_idx = b["valides"] + 1
+    if not b["arbre"] or r_idx > nb_tours(b):
+        return False
+    matchs = list(matchs_tour(b, r_idx))
+    winners = vainqueurs(t, [(f"{key_prefix}_r{r_idx}_m{m_idx}", A, B) for m_idx, A, B in matchs])
+    if winners is None:
+        return False
+    debut = (len(b["arbre"]) // 2) >> r_idx
+    for (m_idx, _, _), w in zip(matchs, winners):
+        b["arbre"][debut + m_idx] = w
+    b["valides"] = r_idx
+    structure_modifiee(t)
+    return True
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""État du tournoi partagé par toutes les sessions d'un processus serveur (sans Streamlit).
+
+Un seul `moteur.Tournoi` par processus : les sessions organisateur le modifient sous
+`verrou` (une modification à la fois), les spectateurs ne lisent que des instantanés
+figés. Un instantané est construit une seule fois par version des résultats
+(uid, rev, version), par le premier lecteur qui le demande, puis servi tel quel à
+toutes les sessions : 200 téléphones coûtent une construction, pas 200.
+"""
+import threading
+import time
+
+class Instantane:
+    """Vue figée d'une version du tournoi : `donnees` ne doit plus être modifié."""
+    __slots__ = ("cle", "numero", "ts", "donnees")
+    def __init__(self, cle, numero, donnees):
+        self.cle = cle
+        self.numero = numero     # +1 à chaque instantané publié (affichage « version n »)
+        self.ts = time.time()
+        self.donnees = donnees
+
+class EtatPartage:
+    def __init__(self, tournoi):
+        self.tournoi = tournoi
+        self.verrou = threading.RLock()   # réentrant : un callback peut appeler une fonction verrouillée
+        self._instantane = None
+        self._numero = 0
+
+    def cle(self):
+        t = self.tournoi
+        return (t.uid, t.rev, t.version)
+
+    def instantane(self, construire):
+        """Dernier instantané ; `construire(tournoi)` n'est appelé (sous verrou) que si l'état
+           a changé depuis. Lecture sans verrou tant que rien n'a bougé."""
+        snap = self._instantane
+        if snap is not None and snap.cle == self.cle():
+            return snap
+        with self.verrou:
+            snap = self._instantane
+            cle = self.cle()
+            if snap is None or snap.cle != cle:
+                self._numero += 1
+                snap = self._instantane = Instantane(cle, self._numero, construire(self.tournoi))
+        return snap
+
+    def remplacer(self, tournoi):
+        """Nouveau tournoi (reset complet) pour toutes les sessions."""
+        with self.verrou:
+            self.tournoi = tournoi
+            self._instantane = None
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Instrumentation optionnelle des reruns (sans Streamlit).
+
+Un `Profil` par rerun, posé dans une ContextVar par `demarrer` : les fonctions décorées
+par `chrono` (ou enrobées par `instrumenter`) y cumulent temps et nombre d'appels, et
+ne coûtent qu'une lecture de ContextVar quand le profilage est coupé. `ecrire` ajoute
+une ligne au fichier JSON-lines et réécrit le fichier texte Prometheus (format
+« textfile collector » : dernières valeurs + compteurs cumulés du processus).
+"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+
+CHEMIN_DEFAUT = "profil.jsonl"   # surchargeable par la variable d'environnement TOURNOI_PROFIL_FICHIER
+
+_courant = contextvars.ContextVar("profil", default=None)
+_lock = threading.Lock()
+_cumuls = {"reruns": 0, "secondes": {}, "appels": {}}   # totaux du processus (compteurs Prometheus)
+
+class Profil:
+    def __init__(self):
+        self.debut = time.perf_counter()
+        self.temps = {}          # {nom: secondes cumulées dans ce rerun}
+        self.appels = {}         # {nom: nb d'appels}
+        self.compteurs = {}      # valeurs libres (joueurs, scores...) ajoutées par la vue
+
+    def ajouter(self, nom, dt):
+        self.temps[nom] = self.temps.get(nom, 0.0) + dt
+        self.appels[nom] = self.appels.get(nom, 0) + 1
+
+    def total(self):
+        return time.perf_counter() - self.debut
+
+    def lignes(self):
+        """[{"Section", "ms", "Appels"}, ...] par temps décroissant (temps inclusifs)."""
+        return [{"Section": nom, "ms": round(dt * 1000, 2), "Appels": self.appels[nom]}
+                for nom, dt in sorted(self.temps.items(), key=lambda x: -x[1])]
+
+def demarrer(actif=True):
+    """Nouveau profil pour ce rerun (ou aucun si `actif` est faux)."""
+    p = Profil() if actif else None
+    _courant.set(p)
+    return p
+
+def chrono(nom):
+    """Décorateur : temps et appels de la fonction dans le profil courant, s'il y en a un."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def enrobe(*args, **kwargs):
+            p = _courant.get()
+            if p is None:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                p.ajouter(nom, time.perf_counter() - t0)
+        enrobe.chronometre = True
+        return enrobe
+    return deco
+
+def instrumenter(module, *noms):
+    """Enrobe des fonctions d'un module par `chrono` (une seule fois par processus) ;
+       les appels internes au module passent aussi par l'enrobage."""
+    for nom in noms:
+        fn = getattr(module, nom)
+        if not getattr(fn, "chronometre", False):
+            setattr(module, nom, chrono(nom)(fn))
+
+def _prometheus(p, total):
+    lignes = [
+        "# HELP tournoi_rerun_secondes Durée du dernier rerun profilé.",
+        "# TYPE tournoi_rerun_secondes gauge",
+        f"tournoi_rerun_secondes {total:.6f}",
+        "# HELP tournoi_section_secondes Temps inclusif par section au dernier rerun.",
+        "# TYPE tournoi_section_secondes gauge",
+    ]
+    lignes += [f'tournoi_section_secondes{{section="{nom}"}} {dt:.6f}' for nom, dt in p.temps.items()]
+    lignes += ["# HELP tournoi_section_secondes_total Temps cumulé par section depuis le démarrage.",
+               "# TYPE tournoi_section_secondes_total counter"]
+    lignes += [f'tournoi_section_secondes_total{{section="{nom}"}} {dt:.6f}' for nom, dt in _cumuls["secondes"].items()]
+    lignes += ["# HELP tournoi_section_appels_total Appels cumulés par section depuis le démarrage.",
+               "# TYPE tournoi_section_appels_total counter"]
+    lignes += [f'tournoi_section_appels_total{{section="{nom}"}} {n}' for nom, n in _cumuls["appels"].items()]
+    lignes += ["# HELP tournoi_reruns_total Reruns profilés depuis le démarrage.",
+               "# TYPE tournoi_reruns_total counter",
+               f"tournoi_reruns_total {_cumuls['reruns']}"]
+    for nom, v in p.compteurs.items():
+        if isinstance(v, (int, float)):
+            lignes += [f"# TYPE tournoi_{nom} gauge", f"tournoi_{nom} {v}"]
+    return "\n".join(lignes) + "\n"
+
+def ecrire(p, chemin=None):
+    """Ajoute le rerun au fichier JSON-lines et réécrit `<chemin sans extension>.prom`."""
+    chemin = chemin or os.environ.get("TOURNOI_PROFIL_FICHIER", CHEMIN_DEFAUT)
+    total = p.total()
+    ligne = {"ts": time.time(), "total_ms": round(total * 1000, 3),
+             "sections": {nom: {"ms": round(dt * 1000, 3), "appels": p.appels[nom]} for nom, dt in p.temps.items()},
+             "compteurs": p.compteurs}
+    with _lock:
+        _cumuls["reruns"] += 1
+        for nom, dt in p.temps.items():
+            _cumuls["secondes"][nom] = _cumuls["secondes"].get(nom, 0.0) + dt
+            _cumuls["appels"][nom] = _cumuls["appels"].get(nom, 0) + p.appels[nom]
+        with open(chemin, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(ligne, ensure_ascii=False) + "\n")
+        prom = os.path.splitext(chemin)[0] + ".prom"
+        with open(prom + ".tmp", "w", encoding="utf-8") as fh:
+            fh.write(_prometheus(p, total))
+        os.replace(prom + ".tmp", prom)   # le collecteur ne lit jamais un fichier à moitié écrit
+    return total
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""Simulateur Monte-Carlo de formats de tournoi (sans Streamlit).
+
+Chaque tournoi synthétique passe par les vrais générateurs du moteur
+(generer_tous_rounds, generer_round round par round en americano / mexicano, ou
+build_pools + generer_tableaux + valider_tour) ; les scores sont tirés jeu par jeu
+selon les niveaux des joueurs. Les tournois sont répartis par lots sur un pool de
+processus, chaque lot ayant ses graines : le résultat ne dépend pas du nombre de
+processus.
+
+Rapport : matchs par joueur, joueurs au repos par créneau, stabilité du classement
+(corrélation de rang avec le niveau réel, écart-type du rang de chaque joueur d'un
+tournoi à l'autre) et durée estimée.
+
+Exemples :
+    python simulation.py --joueurs 40 --terrains 4 --max-matchs 5 -n 2000
+    python simulation.py --joueurs 120 --terrains 10 --max-matchs 8 --mode mexicano -n 200
+    python simulation.py --roster membres.csv --mode poules --poules 4 --equipes 4 --terrains 6
+    python simulation.py --joueurs 64 --mode poules --poules 4 --equipes 8 --equilibre
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import moteur
+
+DUREE_MATCH = 20          # minutes par créneau (un match + rotation)
+ECHELLE_JEU = 2.0         # écart de niveau cumulé de l'équipe donnant ~73 % des jeux
+NIVEAU_MOYEN, NIVEAU_ECART = 4.0, 1.2   # niveaux synthétiques (échelle padel 1-7)
+TAILLE_LOT = 50
+
+# =========================
+#   UN TOURNOI
+# =========================
+def jouer_match(rng, niv1, niv2):
+    """Score tiré jeu par jeu jusqu'à 6 : "6-3", "4-6"..."""
+    q = 1.0 / (1.0 + math.exp(-(niv1 - niv2) / ECHELLE_JEU))
+    a = b = 0
+    while a < 6 and b < 6:
+        if rng.random() < q: a += 1
+        else:                b += 1
+    return f"{a}-{b}"
+
+def _jouer(t, rng, niveaux, keyed):
+    """Joue une liste de (clé, e1, e2) et l'enregistre en un seul lot."""
+    items = [(key, jouer_match(rng, niveaux[e1[0]] + niveaux[e1[1]], niveaux[e2[0]] + niveaux[e2[1]]))
+             for key, e1, e2 in keyed]
+    moteur.saisir_scores(t, items)
+    return len(items)
+
+def _creneaux(nb_matchs, terrains):
+    return -(-nb_matchs // terrains)
+
+def simuler(params, graine):
+    """Un tournoi complet → métriques brutes (voir agreger)."""
+    rng = random.Random(graine)
+    hommes, femmes, niveaux = params["hommes"], params["femmes"], params["niveaux"]
+    terrains = params["terrains"]
+    t = moteur.Tournoi()
+    moteur.sync_joueurs(t, hommes, femmes, niveaux)
+    nb_joueurs = len(t.joueurs)
+    repos = []            # joueurs sans match, par créneau
+    creneaux = 0
+    if params["mode"] in ("rounds", "americano", "mexicano"):
+        if params["mode"] == "rounds":
+            moteur.generer_tous_rounds(t, terrains, params["max_matchs"], rng)
+            # le planning ne dépend pas des scores : tous les rounds joués en un seul lot
+            _jouer(t, rng, niveaux, moteur.iter_matchs_scores(t))
+        else:
+            # round par round (en mexicano le tirage suit le classement) ; saisies une à une :
+            # seuls les joueurs du match sont replacés dans le classement incrémental
+            while moteur.generer_round(t, terrains, params["max_matchs"], rng, formule=params["mode"])[0]:
+                r = len(t.matchs)
+                for i, (e1, e2) in enumerate(t.matchs[-1]):
+                    sc = jouer_match(rng, niveaux[e1[0]] + niveaux[e1[1]], niveaux[e2[0]] + niveaux[e2[1]])
+                    moteur.saisir_score(t, f"score_{r}_{i}", sc, e1, e2)
+        repos = [nb_joueurs - 4 * len(matches) for matches in t.matchs]
+        creneaux = len(t.matchs)
+    else:
+        t.poules["params"].update(nb_poules=params["poules"], teams_per_pool=params["equipes"])
+        moteur.build_pools(t, hommes, femmes, rng, params["equilibre"])
+        keyed = [k for k in moteur.iter_matchs_scores(t) if k[0].startswith("pool_")]
+        _jouer(t, rng, niveaux, keyed)
+        planning = moteur.planifier_creneaux(t.poules["pools"], terrains)
+        repos = [nb_joueurs - 4 * len(c) for c in planning]
+        creneaux = len(planning)
+        moteur.generer_tableaux(t, "poules")
+        teams = t.poules["teams"]
+        while True:
+            tour = []
+            for bracket in ("main_bracket", "cons_bracket"):
+                b = t.poules[bracket]
+                if b["arbre"] and b["valides"] < moteur.nb_tours(b):
+                    r = b["valides"] + 1
+                    pfx = moteur.PREFIXES["poules"][bracket]
+                    tour += [(f"{pfx}_r{r}_m{m}", teams[A], teams[B]) for m, A, B in moteur.matchs_tour(b, r)]
+            if not tour:
+                break
+            _jouer(t, rng, niveaux, tour)
+            for bracket in ("main_bracket", "cons_bracket"):
+                moteur.valider_tour(t, "poules", bracket)
+            for s in range(_creneaux(len(tour), terrains)):
+                repos.append(nb_joueurs - 4 * min(terrains, len(tour) - s * terrains))
+            creneaux += _creneaux(len(tour), terrains)
+    cols = moteur.classement_colonnes(t)
+    rang = {nom: i for i, nom in enumerate(cols["Joueur"].tolist())}
+    rangs = np.array([rang[n] for n in t.joueurs.noms], dtype=np.float64)
+    niv = np.array([niveaux[n] for n in t.joueurs.noms], dtype=np.float64)
+    # Spearman : corrélation des rangs (rang 0 = meilleur, donc signe inversé côté niveau)
+    rho = float(np.corrcoef(rangs, (-niv).argsort().argsort())[0, 1]) if nb_joueurs > 1 else 1.0
+    return {"matchs": t.joueurs.matchs.tolist(), "repos": repos, "rangs": rangs.tolist(),
+            "spearman": rho, "creneaux": creneaux}
+
+def simuler_lot(params, graines):
+    return [simuler(params, g) for g in graines]
+
+# =========================
+#   AGRÉGATION
+# =========================
+def _quantiles(x):
+    x = np.asarray(x, dtype=np.float64)
+    if not len(x):
+        return {}
+    q = {"moyenne": x.mean(), "min": x.min(), "p10": np.percentile(x, 10),
+         "mediane": np.median(x), "p90": np.percentile(x, 90), "max": x.max()}
+    return {k: round(float(v), 3) for k, v in q.items()}
+
+def agreger(resultats, duree_match=DUREE_MATCH):
+    matchs = [m for r in resultats for m in r["matchs"]]
+    repos = [x for r in resultats for x in r["repos"]]
+    rangs = np.array([r["rangs"] for r in resultats])
+    return {
+        "tournois": len(resultats),
+        "matchs_par_joueur": {"distribution": dict(sorted(Counter(matchs).items())), **_quantiles(matchs)},
+        "repos_par_creneau": _quantiles(repos),
+        "spearman_niveau": _quantiles([r["spearman"] for r in resultats]),
+        "ecart_type_rang": round(float(rangs.std(axis=0).mean()), 2) if len(rangs) > 1 else 0.0,
+        "duree_minutes": _quantiles([r["creneaux"] * duree_match for r in resultats]),
+    }
+
+def lancer(params, n, graine=0, processus=None, taille_lot=TAILLE_LOT):
+    """n tournois (graines graine..graine+n-1) répartis sur `processus` processus."""
+    graines = list(range(graine, graine + n))
+    lots = [graines[i:i + taille_lot] for i in range(0, n, taille_lot)]
+    processus = processus or os.cpu_count() or 1
+    if processus == 1:
+        parts = [simuler_lot(params, lot) for lot in lots]
+    else:
+        with ProcessPoolExecutor(max_workers=processus) as ex:
+            parts = list(ex.map(simuler_lot, [params] * len(lots), lots))
+    return [r for part in parts for r in part]
+
+# =========================
+#   CLI
+# =========================
+def roster_synthetique(n, graine):
+    rng = random.Random(graine)
+    hommes = [f"H{i:04d}" for i in range(n - n // 2)]
+    femmes = [f"F{i:04d}" for i in range(n // 2)]
+    niveaux = {nom: min(7.0, max(1.0, rng.gauss(NIVEAU_MOYEN, NIVEAU_ECART))) for nom in hommes + femmes}
+    return hommes, femmes, niveaux
+
+def afficher(rapport, out=sys.stdout):
+    m = rapport["matchs_par_joueur"]
+    print(f"{rapport['tournois']} tournoi(s) simulé(s)", file=out)
+    print("répartition matchs  : " + "  ".join(f"{k}:{v}" for k, v in m["distribution"].items()), file=out)
+    for titre, cle in (("matchs par joueur", "matchs_par_joueur"), ("repos par créneau", "repos_par_creneau"),
+                       ("spearman niveau", "spearman_niveau"), ("durée (min)", "duree_minutes")):
+        q = rapport[cle]
+        if q:
+            print(f"{titre:<20}: moy {q['moyenne']}  p10 {q['p10']:g}  méd {q['mediane']:g}  "
+                  f"p90 {q['p90']:g}  [{q['min']:g} – {q['max']:g}]", file=out)
+    print(f"{'écart-type du rang':<20}: {rapport['ecart_type_rang']} place(s)", file=out)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Simulation Monte-Carlo d'un format de tournoi")
+    ap.add_argument("--joueurs", type=int, default=24, help="roster synthétique (moitié H, moitié F)")
+    ap.add_argument("--roster", help="CSV/XLSX nom,sexe,niveau (niveau manquant = moyenne)")
+    ap.add_argument("--mode", choices=["rounds", "americano", "mexicano", "poules"], default="rounds",
+                    help="poules : tirage aléatoire des paires (vaut aussi pour des poules manuelles)")
+    ap.add_argument("--equilibre", action="store_true", help="poules : paires et poules équilibrées selon les niveaux")
+    ap.add_argument("--terrains", type=int, default=4)
+    ap.add_argument("--max-matchs", type=int, default=4)
+    ap.add_argument("--poules", type=int, default=2)
+    ap.add_argument("--equipes", type=int, default=4, help="équipes par poule")
+    ap.add_argument("-n", "--tournois", type=int, default=1000)
+    ap.add_argument("--graine", type=int, default=0)
+    ap.add_argument("--processus", type=int, default=None, help="défaut : nb de cœurs")
+    ap.add_argument("--duree-match", type=float, default=DUREE_MATCH, help="minutes par créneau")
+    ap.add_argument("--json", action="store_true", help="rapport en JSON")
+    args = ap.parse_args(argv)
+    if args.terrains < 1:
+        ap.error("--terrains doit valoir au moins 1")
+
+    if args.roster:
+        import fichiers
+        with open(args.roster, "rb") as fh:
+            r = fichiers.lire_roster(fichiers.lignes_fichier(fh, args.roster))
+        hommes, femmes = r["hommes"], r["femmes"]
+        if not hommes and not femmes:
+            print("Erreur : aucune ligne valide dans le roster.", file=sys.stderr)
+            return 2
+        niveaux = {n: r["niveaux"].get(n, NIVEAU_MOYEN) for n in hommes + femmes}
+    else:
+        hommes, femmes, niveaux = roster_synthetique(args.joueurs, args.graine)
+    params = {"mode": args.mode, "hommes": hommes, "femmes": femmes, "niveaux": niveaux,
+              "terrains": args.terrains, "max_matchs": args.max_matchs,
+              "poules": args.poules, "equipes": args.equipes, "equilibre": args.equilibre}
+    if args.mode == "poules" and min(len(hommes), len(femmes)) < args.poules * args.equipes:
+        print(f"Erreur : il faut {args.poules * args.equipes} paires H+F.", file=sys.stderr)
+        return 2
+
+    t0 = time.perf_counter()
+    rapport = agreger(lancer(params, args.tournois, args.graine, args.processus), args.duree_match)
+    rapport["secondes"] = round(time.perf_counter() - t0, 2)
+    if args.json:
+        print(json.dumps(rapport, ensure_ascii=False, indent=1))
+    else:
+        afficher(rapport)
+        print(f"({rapport['secondes']} s)", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
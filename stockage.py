@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""Persistance locale du tournoi dans SQLite (mode WAL).
+
+- `evenements` : journal append-only des saisies de score (une ligne par frappe validée),
+- `instantanes` : état compact du tournoi (roster, rounds, poules, tableaux, saisies),
+  réécrit à chaque changement de structure et tous les COMPACTER_TOUS scores ; les
+  événements déjà couverts par un instantané sont alors purgés.
+
+Rechargement = dernier instantané + rejeu des scores postérieurs, puis une seule
+reconstruction vectorisée du classement. Rien d'illisible n'empêche de démarrer : un
+instantané de format incompatible reste archivé et un nouveau tournoi s'ouvre ; un fichier
+qui n'est pas une base SQLite est mis de côté (`.abime-<date>`) et une base neuve est créée.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import moteur
+
+CHEMIN_DEFAUT = "tournoi.db"    # surchargeable par la variable d'environnement TOURNOI_DB
+COMPACTER_TOUS = 500
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evenements (
+    id      INTEGER PRIMARY KEY,
+    tournoi INTEGER NOT NULL,
+    cle     TEXT NOT NULL,
+    saisie  TEXT NOT NULL,
+    ts      REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS instantanes (
+    id                INTEGER PRIMARY KEY,
+    tournoi           INTEGER NOT NULL,
+    dernier_evenement INTEGER NOT NULL,
+    etat              TEXT NOT NULL,
+    ts                REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_evenements ON evenements(tournoi, id);
+CREATE INDEX IF NOT EXISTS ix_instantanes ON instantanes(tournoi, id);
+"""
+
+class Stockage:
+    """Connexion partagée (thread-safe) vers la base ; `tournoi` = numéro du tournoi courant.
+       Un reset complet ouvre un nouveau numéro : les soirées précédentes restent en base."""
+    def __init__(self, chemin=None):
+        chemin = chemin or os.environ.get("TOURNOI_DB", CHEMIN_DEFAUT)
+        self.chemin = chemin
+        self.lock = threading.Lock()
+        self.erreur = None         # motif du dernier problème de base ou de chargement (voir charger)
+        try:
+            self.conn = self._ouvrir(chemin)
+        except sqlite3.DatabaseError as e:
+            # fichier qui n'est pas (ou plus) une base : mis de côté, base neuve au même chemin
+            ecarte = f"{chemin}.abime-{time.strftime('%Y%m%d-%H%M%S')}"
+            for suffixe in ("", "-wal", "-shm"):
+                if os.path.exists(chemin + suffixe):
+                    os.replace(chemin + suffixe, ecarte + suffixe)
+            self.erreur = f"Base {chemin} illisible ({e}) : mise de côté sous {ecarte}, nouvelle base créée"
+            log.error(self.erreur)
+            self.conn = self._ouvrir(chemin)
+        row = self.conn.execute(
+            "SELECT MAX(t) FROM (SELECT MAX(tournoi) AS t FROM instantanes UNION ALL SELECT MAX(tournoi) FROM evenements)"
+        ).fetchone()
+        self.tournoi = row[0] or 1
+        self.rev = None            # révision de structure du dernier instantané écrit
+        self.reglages = None       # compteur de réglages (paramètres, sélections) du même instantané
+        self.nb_depuis_instantane = 0
+
+    @staticmethod
+    def _ouvrir(chemin):
+        # autocommit : chaque saisie est durable dès l'INSERT (WAL + synchronous=NORMAL → pas de fsync)
+        conn = sqlite3.connect(chemin, check_same_thread=False, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+        except sqlite3.DatabaseError:
+            conn.close()
+            raise
+        return conn
+
+    def ecrire_score(self, key, raw):
+        with self.lock:
+            self.conn.execute("INSERT INTO evenements (tournoi, cle, saisie, ts) VALUES (?,?,?,?)",
+                              (self.tournoi, key, raw or "", time.time()))
+            self.nb_depuis_instantane += 1
+
+    def ecrire_scores(self, items):
+        """Lot de (clé, saisie) en une seule transaction."""
+        with self.lock:
+            now = time.time()
+            self.conn.execute("BEGIN")
+            self.conn.executemany("INSERT INTO evenements (tournoi, cle, saisie, ts) VALUES (?,?,?,?)",
+                                  [(self.tournoi, k, r or "", now) for k, r in items])
+            self.conn.execute("COMMIT")
+            self.nb_depuis_instantane += len(items)
+
+    def instantane(self, t):
+        """Écrit l'état complet puis purge ce qu'il rend inutile (compaction)."""
+        etat = json.dumps(moteur.vers_dict(t), ensure_ascii=False, separators=(",", ":"))
+        with self.lock:
+            self.conn.execute("BEGIN")
+            dernier = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM evenements WHERE tournoi=?",
+                                        (self.tournoi,)).fetchone()[0]
+            cur = self.conn.execute("INSERT INTO instantanes (tournoi, dernier_evenement, etat, ts) VALUES (?,?,?,?)",
+                                    (self.tournoi, dernier, etat, time.time()))
+            self.conn.execute("DELETE FROM instantanes WHERE tournoi=? AND id<?", (self.tournoi, cur.lastrowid))
+            self.conn.execute("DELETE FROM evenements WHERE tournoi=? AND id<=?", (self.tournoi, dernier))
+            self.conn.execute("COMMIT")
+            self.rev = t.rev
+            self.reglages = t.reglages
+            self.nb_depuis_instantane = 0
+
+    def sauver_si_modifie(self, t):
+        """À appeler en fin de rerun : instantané si la structure ou un réglage a changé,
+           ou si le journal a grossi."""
+        if self.rev != t.rev or self.reglages != t.reglages or self.nb_depuis_instantane >= COMPACTER_TOUS:
+            self.instantane(t)
+            return True
+        return False
+
+    def charger(self):
+        """Dernier instantané du tournoi courant + scores postérieurs ; None si rien en base.
+           État illisible : None aussi, motif dans `erreur`, et le tournoi suivant est ouvert
+           (l'ancien reste en base, intact)."""
+        try:
+            return self._charger()
+        except (ValueError, KeyError, TypeError, IndexError, AttributeError) as e:
+            self.erreur = (f"Tournoi n°{self.tournoi} illisible ({type(e).__name__}: {e}) : il reste archivé "
+                           f"en base, nouveau tournoi n°{self.tournoi + 1} ouvert")
+            log.exception(self.erreur)
+            self.nouveau_tournoi()
+            return None
+
+    def _charger(self):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT dernier_evenement, etat FROM instantanes WHERE tournoi=? ORDER BY id DESC LIMIT 1",
+                (self.tournoi,)).fetchone()
+            dernier, etat = row if row else (0, None)
+            events = self.conn.execute("SELECT cle, saisie FROM evenements WHERE tournoi=? AND id>? ORDER BY id",
+                                       (self.tournoi, dernier)).fetchall()
+        if etat is None and not events:
+            return None
+        # scores rejoués dans l'état brut : une migration d'ancien format (clés de tableaux
+        # renommées) s'applique aussi aux saisies postérieures à l'instantané
+        d = json.loads(etat) if etat else moteur.vers_dict(moteur.Tournoi())
+        for key, raw in events:
+            if raw: d["scores"][key] = raw
+            else:   d["scores"].pop(key, None)
+        t = moteur.depuis_dict(d)
+        t.ledger["dirty"] = True
+        moteur.maj_classement_global(t)
+        self.rev = t.rev
+        self.reglages = t.reglages
+        self.nb_depuis_instantane = len(events)
+        return t
+
+    def nouveau_tournoi(self):
+        with self.lock:
+            self.tournoi += 1
+            self.rev = None
+            self.reglages = None
+            self.nb_depuis_instantane = 0
+
+    def fermer(self):
+        with self.lock:
+            self.conn.close()
@@ -1,7 +1,23 @@
 # -*- coding: utf-8 -*-
+import functools
+import hmac
+import io
+import os
+import secrets
+import sys
+import time
+
 import streamlit as st
-import random
-import pandas as pd
+
+import affichage
+import fichiers
+import moteur
+import partage
+import profilage
+import stockage
+
+# temps de reconstruction du classement, y compris quand il est appelé depuis le moteur
+profilage.instrumenter(moteur, "maj_classement_global")
 
 # =========================
 #   PAGE + CSS (compact)
@@ -11,7 +27,7 @@ st.markdown(
     """
     <style>
       .block-container {padding-top: .6rem; padding-bottom: .6rem; max-width: 1400px;}
-      .stTable td, .stTable th {padding: .25rem .40rem !important; font-size: 0.92rem;}
+      .stMarkdown table td, .stMarkdown table th {padding: .25rem .40rem !important; font-size: 0.92rem;}
       .stExpander {border: 1px solid #eaeaea !important; margin-bottom: .35rem;}
       table {table-layout: auto;} /* élargit la colonne Joueur automatiquement */
     </style>
@@ -22,48 +38,239 @@ st.markdown(
 # =========================
 #   STATE
 # =========================
+@st.cache_resource
+def ouvrir_stockage():
+    """Base SQLite unique par processus serveur (voir stockage.py)."""
+    return stockage.Stockage()
+
+STORE = ouvrir_stockage()
+
+@st.cache_resource
+def ouvrir_partage():
+    """Tournoi unique du processus serveur, rechargé une seule fois depuis la base et
+       partagé par toutes les sessions (voir partage.py)."""
+    t = STORE.charger()
+    return partage.EtatPartage(t if t is not None else moteur.Tournoi())
+
+PARTAGE = ouvrir_partage()
+
+@st.cache_resource
+def cle_organisateur():
+    """Clé d'accès organisateur : variable TOURNOI_CLE_ORGA, sinon st.secrets["cle_organisateur"],
+       sinon tirée au démarrage du serveur et affichée dans sa console."""
+    cle = os.environ.get("TOURNOI_CLE_ORGA")
+    if not cle:
+        try:
+            cle = st.secrets.get("cle_organisateur")
+        except FileNotFoundError:       # pas de secrets.toml
+            cle = None
+    if not cle:
+        cle = secrets.token_urlsafe(9)
+        print(f"Accès organisateur : ajouter ?orga={cle} à l'adresse du tournoi", file=sys.stderr)
+    return str(cle)
+
+CLE_ORGA = cle_organisateur()
+
+def cle_valide(cle):
+    return bool(cle) and hmac.compare_digest(str(cle).encode(), CLE_ORGA.encode())
+
+# Par défaut lecture seule : seule une session qui présente la clé (?orga=<clé> ou formulaire)
+# peut modifier le tournoi partagé
+if not st.session_state.get("organisateur") and cle_valide(st.query_params.get("orga")):
+    st.session_state.organisateur = True
+SPECTATEUR = not st.session_state.get("organisateur")
+
+@st.cache_resource
+def ouvrir_affichage():
+    """Tableau d'affichage statique si TOURNOI_AFFICHAGE désigne un dossier (voir affichage.py)."""
+    dossier = os.environ.get("TOURNOI_AFFICHAGE")
+    return affichage.Affichage(dossier) if dossier else None
+
+AFFICHAGE = ouvrir_affichage()
+
+def publier_affichage():
+    """Réécrit le tableau d'affichage si les résultats ont changé (à appeler sous verrou)."""
+    if AFFICHAGE is not None:
+        AFFICHAGE.publier(PARTAGE.tournoi)
+
+def sous_verrou(fn):
+    """Callbacks / fragments qui touchent au tournoi partagé : une session à la fois,
+       tableau d'affichage republié ensuite s'il y a lieu."""
+    @functools.wraps(fn)
+    def enrobe(*args, **kwargs):
+        with PARTAGE.verrou:
+            res = fn(*args, **kwargs)
+            publier_affichage()
+            return res
+    return enrobe
+
+def roster_partage(t):
+    """(hommes, femmes) du tournoi partagé, dans l'ordre du roster."""
+    tab = t.joueurs
+    return tuple([n for n, x in zip(tab.noms, tab.sexe) if x == sexe] for sexe in "HF")
+
 def init_state():
-    if "joueurs" not in st.session_state:
-        st.session_state.joueurs = {}  # {nom: {"Points":0.0, "Jeux":0, "Matchs":0, "Sexe":"H/F"}}
-    if "matchs" not in st.session_state:
-        st.session_state.matchs = []   # rounds libres: [ [([H,F],[H,F]), ...], ... ]
-    # Phases finales pour le mode Rounds libres
-    if "finals" not in st.session_state:
-        st.session_state.finals = {"quarts": [], "demis": [], "finale": [], "vainqueur": None}
-    # Poules auto + tableaux
-    if "poules" not in st.session_state:
-        st.session_state.poules = {
-            "params": {"nb_poules": 2, "teams_per_pool": 4},
-            "teams": [],
-            "pools": [],
-            "main_bracket": [],
-            "cons_bracket": [],
-        }
-    # Poules manuelles + tableaux
-    if "poules_manual" not in st.session_state:
-        st.session_state.poules_manual = {
-            "params": {"nb_poules": 2, "teams_per_pool": 4},
-            "selections": {},     # clés "pm_{p}_{s}_H"/"pm_{p}_{s}_F" pour les selectboxes
-            "teams": [],          # liste de paires [(H,F), ...]
-            "pools": [],          # [{"teams":[ids], "matches":[(i,j),...]}, ...]
-            "main_bracket": [],
-            "cons_bracket": [],
-        }
+    # Tout l'état du tournoi vit dans le moteur (voir moteur.Tournoi), partagé entre sessions
+    if "txt_h" not in st.session_state:
+        # le roster de la sidebar reflète l'état partagé (sinon sync_joueurs le viderait) ;
+        # déjà synchronisé : ni découpage ni sync_joueurs au premier rendu
+        roster = roster_partage(PARTAGE.tournoi)
+        st.session_state.txt_h, st.session_state.txt_f = ("\n".join(noms) for noms in roster)
+        st.session_state.roster = roster
+        st.session_state.roster_cle = (st.session_state.txt_h, st.session_state.txt_f)
     if "mode" not in st.session_state:
         st.session_state.mode = "Rounds libres"
+    if "profilage" not in st.session_state:
+        st.session_state.profilage = bool(os.environ.get("TOURNOI_PROFIL"))
 
 init_state()
+T = PARTAGE.tournoi
+PROFIL = profilage.demarrer(st.session_state.profilage)
 
 # =========================
-#   SIDEBAR
+#   SPECTATEURS (vue par défaut)
 # =========================
-st.sidebar.header("⚙️ Paramètres du tournoi")
+# Lecture seule : toutes les sessions spectateur affichent le même instantané, construit une
+# fois par version des résultats ; aucune ne recalcule le classement.
+RAFRAICHIR_SPECTATEURS = 3   # secondes
+
+def construire_instantane(t):
+    """Tables HTML prêtes à afficher (voir affichage.donnees) : classement, Top 8 et blocs
+       [(titre, [(sous-titre, table)])] ; une table None = bandeau (vainqueurs)."""
+    d = affichage.donnees(t)
+    html = affichage.table_html
+    blocs = []
+    if d["rounds"]:
+        blocs.append(("📋 Rounds libres", [(f"Round {r['round']}", html(r["matchs"])) for r in d["rounds"]]))
+    if d["finales"]:
+        blocs.append(("🏆 Phases finales", [(f["phase"], html(f["matchs"])) for f in d["finales"]]))
+    for sec in d["poules"]:
+        blocs.append((f"📦 {sec['section']}", [x for p in sec["poules"] for x in (
+            (f"Poule {p['poule']}", html(p["classement"])), (f"Poule {p['poule']} – matchs", html(p["matchs"])))]))
+    for tab in d["tableaux"]:
+        tables = [(f"Tour {tour['tour']}", html(tour["matchs"])) for tour in tab["tours"]]
+        if tab["vainqueurs"]:
+            tables.append((f"🏆 Vainqueurs : {tab['vainqueurs']}", None))
+        blocs.append((f"📈 {tab['tableau']} – {tab['section']}", tables))
+    return {"classement": html(d["classement"]) if d["classement"] else None,
+            "tops": [("🥇 Top 8 Hommes", html(d["top8"]["H"])), ("🏅 Top 8 Femmes", html(d["top8"]["F"]))],
+            "blocs": blocs}
+
+@st.fragment(run_every=RAFRAICHIR_SPECTATEURS)
+def page_spectateur():
+    """Instantané partagé de la version courante, relu périodiquement (rien n'est recalculé ici)."""
+    snap = PARTAGE.instantane(construire_instantane)
+    d = snap.donnees
+    st.title("🎾 Tournoi de Padel – Résultats en direct")
+    st.caption(f"Version {snap.numero} · mise à jour à {time.strftime('%H:%M:%S', time.localtime(snap.ts))}")
+    st.header("📈 Classement général")
+    if d["classement"] is None:
+        st.info("Aucun résultat pour le moment.")
+        return
+    st.markdown(d["classement"], unsafe_allow_html=True)
+    for col, (titre, table) in zip(st.columns(2), d["tops"]):
+        with col:
+            st.subheader(titre)
+            st.markdown(table, unsafe_allow_html=True)
+    for titre, tables in d["blocs"]:
+        st.markdown("---")
+        st.header(titre)
+        for sous_titre, table in tables:
+            if table is None:
+                st.success(sous_titre)
+            else:
+                st.subheader(sous_titre)
+                st.markdown(table, unsafe_allow_html=True)
+
+def connexion_organisateur():
+    """Callback du formulaire de clé : session organisateur si la clé est bonne."""
+    if cle_valide(st.session_state.get("cle_orga")):
+        st.session_state.organisateur = True
+    else:
+        st.session_state.cle_refusee = True
+    st.session_state.cle_orga = ""
 
-hommes_input = st.sidebar.text_area("Liste des hommes (un par ligne)", height=150, key="txt_h")
-femmes_input = st.sidebar.text_area("Liste des femmes (un par ligne)", height=150, key="txt_f")
+if SPECTATEUR:
+    page_spectateur()
+    with st.expander("🔑 Accès organisateur"):
+        st.text_input("Clé organisateur", type="password", key="cle_orga", on_change=connexion_organisateur)
+        if st.session_state.pop("cle_refusee", False):
+            st.error("Clé refusée.")
+    st.stop()
 
-hommes = [h.strip() for h in hommes_input.splitlines() if h.strip()]
-femmes = [f.strip() for f in femmes_input.splitlines() if f.strip()]
+# =========================
+#   SIDEBAR
+# =========================
+def aligner_roster():
+    """Zones de texte ↔ roster partagé, avant l'affichage des zones. Roster changé par une
+       autre session (import, saisie, reset) : les zones sont rechargées et une saisie faite
+       ici entre-temps est abandonnée au lieu d'écraser la sienne. Sinon, si le texte a
+       changé : découpage + une seule synchro."""
+    ss = st.session_state
+    texte = (ss.txt_h, ss.txt_f)
+    with PARTAGE.verrou:
+        t = PARTAGE.tournoi
+        actuel = roster_partage(t)
+        if actuel != ss.roster:
+            ss.txt_h, ss.txt_f = ("\n".join(noms) for noms in actuel)
+            if texte != ss.roster_cle:
+                ss.avertissement = "Roster modifié dans une autre session : listes rechargées, saisie ignorée."
+            ss.roster = actuel
+            ss.roster_cle = (ss.txt_h, ss.txt_f)
+        elif texte != ss.roster_cle:
+            moteur.sync_joueurs(t, *([n.strip() for n in x.splitlines() if n.strip()] for x in texte))
+            ss.roster = roster_partage(t)
+            ss.roster_cle = texte
+
+aligner_roster()
+st.sidebar.header("⚙️ Paramètres du tournoi")
+if "avertissement" in st.session_state:
+    st.warning(st.session_state.pop("avertissement"))
+if STORE.erreur:
+    st.sidebar.warning(f"⚠️ {STORE.erreur}.")
+
+@sous_verrou
+def importer_roster():
+    """Callback : fichier lu en flux, une seule synchro du roster, zones de texte alignées."""
+    fichier = st.session_state.get("fichier_roster")
+    if fichier is None:
+        return
+    try:
+        r = fichiers.lire_roster(fichiers.lignes_fichier(fichier, fichier.name))
+    except ValueError as e:
+        st.session_state.import_roster = ("error", str(e), [])
+        return
+    if not r["hommes"] and not r["femmes"]:
+        # rien de valide : surtout ne pas vider le roster partagé
+        st.session_state.import_roster = ("error", "Aucune ligne valide : roster inchangé.", r["erreurs"])
+        return
+    moteur.sync_joueurs(PARTAGE.tournoi, r["hommes"], r["femmes"], r["niveaux"])
+    st.session_state.txt_h = "\n".join(r["hommes"])
+    st.session_state.txt_f = "\n".join(r["femmes"])
+    # listes déjà synchronisées : le rerun ne redécoupe pas le texte
+    st.session_state.roster = roster_partage(PARTAGE.tournoi)
+    st.session_state.roster_cle = (st.session_state.txt_h, st.session_state.txt_f)
+    msg = f"{len(r['hommes'])} hommes, {len(r['femmes'])} femmes importés"
+    if r["niveaux"]:  msg += f", {len(r['niveaux'])} niveaux"
+    if r["doublons"]: msg += f" ({r['doublons']} doublon(s) ignoré(s))"
+    st.session_state.import_roster = ("success", msg + ".", r["erreurs"])
+
+st.sidebar.text_area("Liste des hommes (un par ligne)", height=150, key="txt_h")
+st.sidebar.text_area("Liste des femmes (un par ligne)", height=150, key="txt_f")
+
+with st.sidebar.expander("📥 Importer un roster (CSV / XLSX)"):
+    st.file_uploader("Colonnes : nom, sexe (H/F), niveau (facultatif)", type=["csv", "txt", "xlsx"],
+                     key="fichier_roster")
+    st.button("Importer", on_click=importer_roster, use_container_width=True)
+    if "import_roster" in st.session_state:
+        niveau, msg, erreurs = st.session_state.import_roster
+        getattr(st, niveau)(msg)
+        if erreurs:
+            st.warning(f"{len(erreurs)} ligne(s) ignorée(s) :\n\n" +
+                       "\n".join(f"- ligne {n} : {motif}" for n, motif in erreurs[:20]) +
+                       ("\n- …" if len(erreurs) > 20 else ""))
+
+hommes, femmes = st.session_state.roster
 
 st.sidebar.markdown("---")
 st.sidebar.markdown(f"👨 **Hommes :** {len(hommes)}")
@@ -71,320 +278,259 @@ st.sidebar.markdown(f"👩 **Femmes :** {len(femmes)}")
 st.sidebar.markdown(f"🎯 **Total :** {len(hommes)+len(femmes)}")
 st.sidebar.markdown("---")
 
+MODES = ["Rounds libres", "Americano", "Mexicano", "Poules + Élimination", "Poules (manuelles)"]
+FORMULES = {"Rounds libres": "libre", "Americano": "americano", "Mexicano": "mexicano"}   # modes à rounds
 mode = st.sidebar.radio(
     "Mode du tournoi",
-    ["Rounds libres", "Poules + Élimination", "Poules (manuelles)"],
-    index=["Rounds libres", "Poules + Élimination", "Poules (manuelles)"].index(st.session_state.mode)
+    MODES,
+    index=MODES.index(st.session_state.mode)
 )
 st.session_state.mode = mode
 
 nb_terrains = st.sidebar.number_input("Nombre de terrains disponibles", 1, 10, 4)
-max_matchs = st.sidebar.number_input("Nombre maximum de matchs par joueur (Rounds libres)", 1, 20, 4)
+max_matchs = st.sidebar.number_input("Nombre maximum de matchs par joueur (Rounds libres, Americano, Mexicano)", 1, 20, 4)
+diversite = st.sidebar.checkbox("🔀 Varier partenaires & adversaires (Rounds libres)", value=False,
+                                help="Évite de reformer les mêmes duos et de rejouer les mêmes adversaires.")
+
+@sous_verrou
+def importer_scores():
+    """Callback du formulaire : toutes les lignes valides en une seule mise à jour (un seul rerun),
+       les lignes invalides rapportées ensemble."""
+    t = PARTAGE.tournoi
+    sources = [("texte", (st.session_state.get("scores_lot") or "").splitlines())]
+    fichier = st.session_state.get("fichier_scores")
+    if fichier is not None:
+        sources.append((fichier.name, fichiers.lignes_texte(fichier)))
+    items, erreurs = [], []
+    for source, lignes in sources:
+        ok, ko = fichiers.valider_scores(t, fichiers.lire_scores(lignes))
+        items += ok
+        erreurs += [(f"{source} ligne {n}", motif) for n, motif in ko]
+    if items:
+        moteur.saisir_scores(t, items)
+        STORE.ecrire_scores(items)
+        for key, _ in items:   # les champs se rechargeront depuis le moteur
+            st.session_state.pop(key, None)
+        if not erreurs:
+            st.session_state.scores_lot = ""
+    st.session_state.import_scores = (len(items), erreurs)
+
+with st.sidebar.expander("📋 Scores en lot"):
+    with st.form("form_scores_lot"):
+        st.text_area("Une ligne `match_id,score` (ex. `score_1_0,6-4`)", height=120, key="scores_lot")
+        st.file_uploader("… ou un CSV match_id,score", type=["csv", "txt"], key="fichier_scores")
+        st.form_submit_button("Enregistrer les scores", on_click=importer_scores, use_container_width=True)
+    if "import_scores" in st.session_state:
+        nb, erreurs = st.session_state.import_scores
+        if nb:
+            st.success(f"{nb} score(s) enregistré(s).")
+        if erreurs:
+            st.error(f"{len(erreurs)} ligne(s) refusée(s) :\n\n" +
+                     "\n".join(f"- {ou} : {motif}" for ou, motif in erreurs[:30]) +
+                     ("\n- …" if len(erreurs) > 30 else ""))
+
+def export_fichier(table, format):
+    """Contenu du fichier, produit seulement au clic (download_button différé)."""
+    t = PARTAGE.tournoi
+    def produire():
+        buf = io.BytesIO()
+        with PARTAGE.verrou:
+            fichiers.exporter(t, table, buf, format)
+        return buf.getvalue()
+    return produire
+
+with st.sidebar.expander("💾 Export"):
+    format_export = st.radio("Format", ["csv", "parquet"], horizontal=True, key="format_export")
+    for table in fichiers.TABLES:
+        st.download_button(f"{table}.{format_export}", export_fichier(table, format_export),
+                           file_name=f"{table}.{format_export}", on_click="ignore",
+                           mime="text/csv" if format_export == "csv" else "application/octet-stream",
+                           key=f"export_{table}", use_container_width=True)
+
+st.sidebar.checkbox("⏱️ Profilage des reruns", key="profilage",
+                    help="Temps par section dans la sidebar + fichiers profil.jsonl / profil.prom.")
+
+st.sidebar.caption("👀 Vue spectateurs (lecture seule) : l'adresse sans `?orga=`.")
 
 if st.sidebar.button("🔄 Reset Tournoi Complet", use_container_width=True):
-    st.session_state.clear()
-    init_state()
-    st.rerun()
-
-# =========================
-#   SYNC JOUEURS
-# =========================
-def sync_joueurs():
-    nouveaux = set(hommes + femmes)
-    for j in list(st.session_state.joueurs.keys()):
-        if j not in nouveaux:
-            del st.session_state.joueurs[j]
-    for h in hommes:
-        if h not in st.session_state.joueurs:
-            st.session_state.joueurs[h] = {"Points":0.0,"Jeux":0,"Matchs":0,"Sexe":"H"}
-    for f in femmes:
-        if f not in st.session_state.joueurs:
-            st.session_state.joueurs[f] = {"Points":0.0,"Jeux":0,"Matchs":0,"Sexe":"F"}
-
-sync_joueurs()
+    st.session_state.confirmer_reset = True
+if st.session_state.get("confirmer_reset"):
+    st.sidebar.warning("Effacer le tournoi pour **toutes** les sessions ? (il reste archivé en base)")
+    c1, c2 = st.sidebar.columns(2)
+    if c1.button("✅ Oui, tout effacer", use_container_width=True):
+        with PARTAGE.verrou:
+            STORE.nouveau_tournoi()  # l'ancien tournoi reste archivé en base
+            PARTAGE.remplacer(moteur.Tournoi())
+        st.session_state.clear()
+        st.session_state.organisateur = True
+        init_state()
+        st.rerun()
+    if c2.button("Annuler", use_container_width=True):
+        del st.session_state.confirmer_reset
+        st.rerun()
 
 # =========================
 #   OUTILS
 # =========================
-def render_table_compact(df):
-    """Affiche table compacte, 1 décimale pour Points si présent."""
-    if "Points" in df.columns and len(df) > 0:
-        df = df.copy()
-        df["Points"] = df["Points"].map(lambda x: f"{float(x):.1f}")
-    st.table(df)
-
-def add_points(players, s_g, s_p, gagnants, perdants):
-    """Barème : Gagnant 3 + 0.1*jeux ; Perdant 0.5 + 0.1*jeux (MAJ jeux/matchs)."""
-    for p in gagnants:
-        players[p]["Points"] += 3.0 + s_g * 0.1
-        players[p]["Jeux"]   += s_g
-        players[p]["Matchs"] += 1
-    for p in perdants:
-        players[p]["Points"] += 0.5 + s_p * 0.1
-        players[p]["Jeux"]   += s_p
-        players[p]["Matchs"] += 1
-
-def parse_score(s):
-    try:
-        a,b = map(int, s.strip().split("-"))
-        return a,b
-    except Exception:
-        return None
+@profilage.chrono("render_table_compact")
+def render_table_compact(table):
+    """Affiche une table compacte : HTML déjà construit ou lignes [{colonne: valeur}]
+       (ni pandas ni Arrow, la première page reste légère)."""
+    if not isinstance(table, str):
+        table = affichage.table_html(table)
+    st.markdown(table, unsafe_allow_html=True)
+
+@sous_verrou
+def enregistrer_score(key, e1, e2):
+    """Callback d'un champ score : le moteur n'applique que le delta de ce match, la base l'archive.
+       Équipes relues dans le tournoi partagé : si une autre session a recréé ou supprimé ce
+       match depuis l'affichage de la ligne (e1, e2), la saisie est refusée."""
+    t = PARTAGE.tournoi
+    equipes = moteur.index_matchs(t).get(key)
+    if equipes is None or [tuple(e) for e in equipes] != [tuple(e1), tuple(e2)]:
+        st.session_state[key] = t.scores.get(key, "")
+        st.session_state.score_perime = key
+        return
+    raw = st.session_state.get(key)
+    moteur.saisir_score(t, key, raw, *equipes)
+    STORE.ecrire_score(key, (raw or "").strip())
+
+def champ_score(label, key, e1, e2):
+    """Champ score branché sur le registre du moteur (seul le match modifié est recompté)."""
+    t = PARTAGE.tournoi
+    if st.session_state.get("score_perime") == key:
+        # ligne affichée avant un changement de structure fait ailleurs : toute la page se recharge
+        del st.session_state.score_perime
+        st.session_state.avertissement = (f"Le match {key} a changé dans une autre session : "
+                                          "saisie ignorée, page mise à jour.")
+        st.rerun()
+    # widget non rendu au tour précédent (changement de mode) : on reprend la saisie du moteur
+    if key not in st.session_state and key in t.scores:
+        st.session_state[key] = t.scores[key]
+    st.text_input(label, key=key, label_visibility="collapsed",
+                  on_change=enregistrer_score, args=(key, e1, e2))
+
+@st.fragment
+def ligne_score(texte, label, key, e1, e2):
+    """Une ligne de match : taper un score ne relance que cette ligne (fragment)."""
+    c1, c2 = st.columns([3,1])
+    with c1:
+        st.write(texte)
+    with c2:
+        champ_score(label, key, e1, e2)
+
+def oublier_widgets(*prefixes):
+    """Vide les champs score dont la structure vient d'être recréée (le moteur a déjà oublié les scores)."""
+    for key in list(st.session_state.keys()):
+        if isinstance(key, str) and key.startswith(prefixes):
+            del st.session_state[key]
+
+def oublier_widgets_section(name):
+    pfx = moteur.PREFIXES[name]
+    oublier_widgets(pfx["pool"] + "_", pfx["main_bracket"] + "_r", pfx["cons_bracket"] + "_r")
 
 # =========================
 #   CLASSEMENT GLOBAL
 # =========================
-def maj_classement_global():
-    # reset
-    for j in st.session_state.joueurs:
-        st.session_state.joueurs[j]["Points"] = 0.0
-        st.session_state.joueurs[j]["Jeux"]   = 0
-        st.session_state.joueurs[j]["Matchs"] = 0
-
-    # 1) Rounds libres
-    for r, matches in enumerate(st.session_state.matchs, start=1):
-        for m_idx, (e1, e2) in enumerate(matches):
-            raw = (st.session_state.get(f"score_{r}_{m_idx}") or "").strip()
-            sc = parse_score(raw)
-            if not sc: continue
-            s1, s2 = sc
-            if s1 > s2:
-                add_points(st.session_state.joueurs, s1, s2, e1, e2)
-            else:
-                add_points(st.session_state.joueurs, s2, s1, e2, e1)
-
-    # 2) Phases finales (Rounds libres)
-    finals = st.session_state.finals
-    for idx, (A,B) in enumerate(finals.get("quarts", [])):
-        raw = (st.session_state.get(f"rl_quart_{idx}") or "").strip()
-        sc = parse_score(raw)
-        if not sc: continue
-        s1, s2 = sc
-        if s1 > s2: add_points(st.session_state.joueurs, s1, s2, A, B)
-        else:      add_points(st.session_state.joueurs, s2, s1, B, A)
-
-    for idx, (A,B) in enumerate(finals.get("demis", [])):
-        raw = (st.session_state.get(f"rl_demi_{idx}") or "").strip()
-        sc = parse_score(raw)
-        if not sc: continue
-        s1, s2 = sc
-        if s1 > s2: add_points(st.session_state.joueurs, s1, s2, A, B)
-        else:      add_points(st.session_state.joueurs, s2, s1, B, A)
-
-    for idx, (A,B) in enumerate(finals.get("finale", [])):
-        raw = (st.session_state.get("rl_finale") or "").strip()
-        sc = parse_score(raw)
-        if not sc: continue
-        s1, s2 = sc
-        if s1 > s2: add_points(st.session_state.joueurs, s1, s2, A, B)
-        else:      add_points(st.session_state.joueurs, s2, s1, B, A)
-
-    # 3) Poules auto (+ tableaux)
-    pools = st.session_state.poules.get("pools", [])
-    teams = st.session_state.poules.get("teams", [])
-    for p_idx, pool in enumerate(pools):
-        for m_idx, (ti,tj) in enumerate(pool.get("matches", [])):
-            raw = (st.session_state.get(f"pool_{p_idx}_m_{m_idx}") or "").strip()
-            sc = parse_score(raw)
-            if not sc: continue
-            s1, s2 = sc
-            e1, e2 = teams[ti], teams[tj]
-            if s1 > s2: add_points(st.session_state.joueurs, s1, s2, e1, e2)
-            else:      add_points(st.session_state.joueurs, s2, s1, e2, e1)
-
-    for name in ("main_bracket", "cons_bracket"):
-        bracket = st.session_state.poules.get(name, [])
-        for r_idx, rnd in enumerate(bracket, start=1):
-            for m_idx, (A,B) in enumerate(rnd):
-                raw = (st.session_state.get(f"{name}_r{r_idx}_m{m_idx}") or "").strip()
-                sc = parse_score(raw)
-                if not sc: continue
-                s1, s2 = sc
-                if s1 > s2: add_points(st.session_state.joueurs, s1, s2, A, B)
-                else:      add_points(st.session_state.joueurs, s2, s1, B, A)
-
-    # 4) Poules manuelles (+ tableaux)
-    mpools = st.session_state.poules_manual.get("pools", [])
-    mteams = st.session_state.poules_manual.get("teams", [])
-    for p_idx, pool in enumerate(mpools):
-        for m_idx, (ti,tj) in enumerate(pool.get("matches", [])):
-            raw = (st.session_state.get(f"mpool_{p_idx}_m_{m_idx}") or "").strip()
-            sc = parse_score(raw)
-            if not sc: continue
-            s1, s2 = sc
-            e1, e2 = mteams[ti], mteams[tj]
-            if s1 > s2: add_points(st.session_state.joueurs, s1, s2, e1, e2)
-            else:      add_points(st.session_state.joueurs, s2, s1, e2, e1)
-
-    for name in ("manual_main_bracket", "manual_cons_bracket"):
-        bracket = st.session_state.poules_manual.get(name, [])
-        for r_idx, rnd in enumerate(bracket, start=1):
-            for m_idx, (A,B) in enumerate(rnd):
-                raw = (st.session_state.get(f"{name}_r{r_idx}_m{m_idx}") or "").strip()
-                sc = parse_score(raw)
-                if not sc: continue
-                s1, s2 = sc
-                if s1 > s2: add_points(st.session_state.joueurs, s1, s2, A, B)
-                else:      add_points(st.session_state.joueurs, s2, s1, B, A)
-
-def df_classement():
-    """Classement robuste même si 0 joueur."""
-    if not st.session_state.joueurs:
-        return pd.DataFrame(columns=["Joueur","Sexe","Points","Jeux","Matchs"])
-    df = pd.DataFrame.from_dict(st.session_state.joueurs, orient="index").reset_index()
-    df.rename(columns={"index":"Joueur"}, inplace=True)
-    for c,typ in (("Points", float), ("Jeux", int), ("Matchs", int), ("Sexe", str)):
-        if c not in df.columns:
-            df[c] = 0.0 if typ is float else ("" if typ is str else 0)
-        df[c] = df[c].astype(typ) if typ is not str else df[c].astype(str)
-    df["Points"] = df["Points"].round(1)
-    df = df.sort_values(by=["Points","Jeux"], ascending=False).reset_index(drop=True)
-    return df
-
-def top8_tables(df):
+# Durées en secondes : une durée en texte ("2s", "30m") fait importer pandas par Streamlit
+RAFRAICHIR_CLASSEMENT = 2     # période de rafraîchissement du fragment classement
+# Cache des tables, partagé entre sessions : borné en nombre d'entrées et en durée de vie
+CACHE_MAX_ENTREES = 256
+CACHE_TTL = 30 * 60
+
+@st.cache_data(max_entries=CACHE_MAX_ENTREES, ttl=CACHE_TTL, show_spinner=False)
+def _tables_classement_cache(cle, _t):
+    lignes = affichage.lignes_classement(_t)
+    if not lignes:
+        return None
+    return {"classement": affichage.table_html(lignes),
+            "H": affichage.table_html(affichage.top8(lignes, "H")),
+            "F": affichage.table_html(affichage.top8(lignes, "F"))}
+
+@profilage.chrono("tables_classement")
+def tables_classement():
+    """Classement + Top 8 en HTML (None si 0 joueur) ; reconstruits seulement si les résultats ont changé.
+       Tournoi relu dans PARTAGE : un fragment relancé seul ne voit pas le T d'un rerun complet."""
+    t = PARTAGE.tournoi
+    return _tables_classement_cache((t.uid, t.rev, t.version), t)
+
+@st.fragment(run_every=RAFRAICHIR_CLASSEMENT)
+@sous_verrou
+def fragment_classement(msg_vide, top8=False):
+    """Classement général (+ Top 8) : fragment autonome, rafraîchi périodiquement pour suivre
+       les saisies faites dans les fragments de matchs sans relancer toute la page."""
+    tables = tables_classement()
+    if tables is None:
+        st.info(msg_vide)
+    else:
+        render_table_compact(tables["classement"])
+    if top8:
+        st.markdown("---")
+        # === TOP 8 toujours affiché ===
+        top8_tables(tables)
+
+def top8_tables(tables):
     c1, c2 = st.columns(2)
     with c1:
         st.subheader("🥇 Top 8 Hommes")
-        topH = df[df["Sexe"]=="H"].head(8)[["Joueur","Points","Jeux","Matchs"]].reset_index(drop=True)
-        render_table_compact(topH)
+        render_table_compact(tables["H"] if tables else [])
     with c2:
         st.subheader("🏅 Top 8 Femmes")
-        topF = df[df["Sexe"]=="F"].head(8)[["Joueur","Points","Jeux","Matchs"]].reset_index(drop=True)
-        render_table_compact(topF)
+        render_table_compact(tables["F"] if tables else [])
 
 # =========================
 #   ROUNDS LIBRES
 # =========================
-def scheduled_counts_rounds():
-    counts = {j: 0 for j in st.session_state.joueurs}
-    for rnd in st.session_state.matchs:
-        for e1,e2 in rnd:
-            for p in e1+e2:
-                if p in counts:
-                    counts[p] += 1
-    return counts
-
-def generer_round():
-    counts = scheduled_counts_rounds()
-    eligibles = [j for j in st.session_state.joueurs if counts[j] < max_matchs]
-    H = [j for j in eligibles if st.session_state.joueurs[j]["Sexe"]=="H"]
-    F = [j for j in eligibles if st.session_state.joueurs[j]["Sexe"]=="F"]
-
-    rnd = random.random
-    H.sort(key=lambda x:(counts[x], rnd()))
-    F.sort(key=lambda x:(counts[x], rnd()))
-
-    matches = []
-    terrains = min(nb_terrains, len(H)//2, len(F)//2)
-    for _ in range(terrains):
-        if len(H)>=2 and len(F)>=2:
-            h1,h2 = H.pop(0), H.pop(0)
-            f1,f2 = F.pop(0), F.pop(0)
-            matches.append(([h1,f1],[h2,f2]))
-    if matches:
-        st.session_state.matchs.append(matches)
-        return True, len(matches)
-    return False, 0
-
-def generer_tous_rounds():
-    n = 0
-    while True:
-        ok, nb = generer_round()
-        if not ok or nb==0:
-            break
-        n += 1
-    return n
-
-# ===== Phases finales (Rounds libres) =====
-def generate_quarts_from_top8(df):
-    """Top8 H + Top8 F → 4 quarts aléatoires H+F vs H+F (croisement 0..3 avec 4..7)."""
-    Hq = df[df["Sexe"]=="H"]["Joueur"].tolist()[:8]
-    Fq = df[df["Sexe"]=="F"]["Joueur"].tolist()[:8]
-    if len(Hq) < 8 or len(Fq) < 8:
-        st.error(f"❌ Il faut au moins 8 hommes ET 8 femmes dans le classement (actuellement {len(Hq)}H / {len(Fq)}F).")
-        return False
-    random.shuffle(Hq); random.shuffle(Fq)
-    quarts = []
-    for i in range(4):
-        quarts.append(([Hq[i], Fq[i]], [Hq[i+4], Fq[i+4]]))
-    st.session_state.finals["quarts"] = quarts
-    st.session_state.finals["demis"]  = []
-    st.session_state.finals["finale"] = []
-    st.session_state.finals["vainqueur"] = None
-    return True
-
-def recomposed_semis_from_quarters_winners(winners):
-    """Recompose aléatoirement 4 gagnants (H séparés et F séparées) en nouvelles paires H+F,
-       en évitant de reproduire les **mêmes duos H-F** qu'en quarts."""
-    forbidden = set((t[0],t[1]) for t in winners)
-    H = [t[0] for t in winners]
-    F = [t[1] for t in winners]
-    ok = False
-    for _ in range(2000):
-        random.shuffle(H); random.shuffle(F)
-        pairs = list(zip(H,F))
-        if all((h,f) not in forbidden for (h,f) in pairs):
-            ok = True
-            break
-    if not ok:
-        pairs = list(zip(H,F))  # fallback
-    random.shuffle(pairs)
-    return [ (list(pairs[0]), list(pairs[1])), (list(pairs[2]), list(pairs[3])) ]
-
-def section_rounds_libres():
-    st.title("🎾 Tournoi de Padel – Rounds libres")
-
-    counts = scheduled_counts_rounds()
-    H_elig = sum(1 for j in st.session_state.joueurs
-                 if st.session_state.joueurs[j]["Sexe"]=="H" and counts[j]<max_matchs)
-    F_elig = sum(1 for j in st.session_state.joueurs
-                 if st.session_state.joueurs[j]["Sexe"]=="F" and counts[j]<max_matchs)
+LEGENDES_FORMULES = {
+    "americano": "Partenaires tournants : chaque round reforme les duos H+F en évitant partenaires et adversaires déjà joués.",
+    "mexicano": "Chaque round est tiré sur le classement à jour : les mieux classés ensemble au terrain 1, "
+                "le meilleur homme avec la moins bien classée des deux femmes. Saisir tous les scores avant le tirage suivant.",
+}
+
+@profilage.chrono("section_rounds_libres")
+def section_rounds_libres(formule="libre", titre="Rounds libres"):
+    st.title(f"🎾 Tournoi de Padel – {titre}")
+    if formule in LEGENDES_FORMULES:
+        st.caption(LEGENDES_FORMULES[formule])
+
+    H_elig, F_elig = moteur.nb_eligibles(T, max_matchs)
     terrains_theo = min(nb_terrains, H_elig//2, F_elig//2)
 
-    maj_classement_global()
-    df_now = df_classement()
-
     c1, c2 = st.columns(2)
     with c1:
-        if terrains_theo>0 and st.button("⚡ Générer 1 round", use_container_width=True):
-            ok, nb = generer_round()
-            if ok:
-                st.success(f"✅ Round {len(st.session_state.matchs)} généré ({nb} match(s))")
-                st.rerun()
+        label = "⚡ Tirer le round suivant (classement)" if formule == "mexicano" else "⚡ Générer 1 round"
+        if terrains_theo>0 and st.button(label, use_container_width=True):
+            try:
+                ok, nb = moteur.generer_round(T, nb_terrains, max_matchs, diversite=diversite, formule=formule)
+            except ValueError as e:
+                st.error(f"❌ {e}")
             else:
-                st.warning("Aucun match supplémentaire possible.")
+                if ok:
+                    st.success(f"✅ Round {len(T.matchs)} généré ({nb} match(s))")
+                    st.rerun()
+                else:
+                    st.warning("Aucun match supplémentaire possible.")
     with c2:
-        if terrains_theo>0 and st.button("🚀 Générer TOUS les rounds", use_container_width=True):
-            nb = generer_tous_rounds()
+        # Mexicano : un round à la fois, chaque tirage dépend des résultats du précédent
+        if terrains_theo>0 and formule != "mexicano" and st.button("🚀 Générer TOUS les rounds", use_container_width=True):
+            nb = moteur.generer_tous_rounds(T, nb_terrains, max_matchs, diversite=diversite, formule=formule)
             if nb>0:
                 st.success(f"✅ {nb} round(s) générés")
                 st.rerun()
             else:
                 st.warning("Aucun round supplémentaire possible.")
 
-    if st.session_state.matchs:
+    if T.matchs:
         st.header("📋 Matchs du tournoi")
-        for r,matches in enumerate(st.session_state.matchs, start=1):
-            with st.expander(f"🏆 Round {r} - {len(matches)} match(s)", expanded=(r==len(st.session_state.matchs))):
+        for r,matches in enumerate(T.matchs, start=1):
+            with st.expander(f"🏆 Round {r} - {len(matches)} match(s)", expanded=(r==len(T.matchs))):
                 for idx,(e1,e2) in enumerate(matches):
-                    cc1, cc2 = st.columns([3,1])
-                    with cc1:
-                        st.write(f"**Terrain {idx+1}:** {e1[0]} (H)+{e1[1]} (F)  🆚  {e2[0]} (H)+{e2[1]} (F)")
-                    with cc2:
-                        st.text_input("Score (ex: 6-4)", key=f"score_{r}_{idx}", label_visibility="collapsed")
+                    ligne_score(f"**Terrain {idx+1}:** {e1[0]} (H)+{e1[1]} (F)  🆚  {e2[0]} (H)+{e2[1]} (F)",
+                                "Score (ex: 6-4)", f"score_{r}_{idx}", e1, e2)
 
     st.markdown("---")
     st.header("📈 Classement général")
-    df = df_classement()
-    if df.empty:
-        st.info("Ajoute des joueurs dans la barre latérale pour commencer.")
-    else:
-        df.insert(0,"Rang", df.index+1)
-        render_table_compact(df)
-
-    st.markdown("---")
-    # === TOP 8 toujours affiché ===
-    top8_tables(df)
+    fragment_classement("Ajoute des joueurs dans la barre latérale pour commencer.", top8=True)
 
     # === PHASES FINALES ===
     st.markdown("---")
@@ -392,63 +538,53 @@ def section_rounds_libres():
     c1, c2 = st.columns(2)
     with c1:
         if st.button("⚡ Quarts Top 8 (H & F) – Tirage aléatoire", use_container_width=True):
-            if generate_quarts_from_top8(df):
+            try:
+                moteur.generate_quarts_from_top8(T, moteur.classement(T))
+            except ValueError as e:
+                st.error(f"❌ {e}")
+            else:
+                oublier_widgets("rl_")
                 st.success("✅ Quarts générés !")
                 st.rerun()
     with c2:
         if st.button("♻️ Reset Phases Finales", use_container_width=True):
-            st.session_state.finals = {"quarts": [], "demis": [], "finale": [], "vainqueur": None}
+            moteur.reset_finals(T)
+            oublier_widgets("rl_")
             st.success("Phases finales réinitialisées.")
             st.rerun()
 
-    finals = st.session_state.finals
+    finals = T.finals
 
     # Quarts
     if finals["quarts"]:
         st.subheader("⚔️ Quarts de finale")
         for idx,(A,B) in enumerate(finals["quarts"]):
-            c1,c2 = st.columns([3,1])
-            with c1:
-                st.write(f"**Match {idx+1}:** {A[0]} (H)+{A[1]} (F)  🆚  {B[0]} (H)+{B[1]} (F)")
-            with c2:
-                st.text_input("Score", key=f"rl_quart_{idx}", label_visibility="collapsed")
+            ligne_score(f"**Match {idx+1}:** {A[0]} (H)+{A[1]} (F)  🆚  {B[0]} (H)+{B[1]} (F)",
+                        "Score", f"rl_quart_{idx}", A, B)
         if st.button("➡️ Valider & Tirage aléatoire des Demi-finales"):
-            winners=[]; ok_all=True
-            for idx,(A,B) in enumerate(finals["quarts"]):
-                raw=(st.session_state.get(f"rl_quart_{idx}") or "").strip()
-                sc=parse_score(raw)
-                if not sc: ok_all=False; break
-                s1,s2=sc
-                winners.append(A if s1>s2 else B)
-            if not ok_all or len(winners)!=4:
-                st.warning("Veuillez compléter tous les scores des quarts.")
+            try:
+                ok = moteur.valider_quarts(T)
+            except ValueError as e:
+                st.error(f"❌ {e}")
             else:
-                st.session_state.finals["demis"] = recomposed_semis_from_quarters_winners(winners)
-                st.success("✅ Demi-finales créées !")
-                st.rerun()
+                if not ok:
+                    st.warning("Veuillez compléter tous les scores des quarts.")
+                else:
+                    oublier_widgets("rl_demi_", "rl_finale")
+                    st.success("✅ Demi-finales créées !")
+                    st.rerun()
 
     # Demis
     if finals["demis"]:
         st.subheader("⚔️ Demi-finales")
         for idx,(A,B) in enumerate(finals["demis"]):
-            c1,c2 = st.columns([3,1])
-            with c1:
-                st.write(f"**Demi {idx+1}:** {A[0]} (H)+{A[1]} (F)  🆚  {B[0]} (H)+{B[1]} (F)")
-            with c2:
-                st.text_input("Score", key=f"rl_demi_{idx}", label_visibility="collapsed")
+            ligne_score(f"**Demi {idx+1}:** {A[0]} (H)+{A[1]} (F)  🆚  {B[0]} (H)+{B[1]} (F)",
+                        "Score", f"rl_demi_{idx}", A, B)
         if st.button("➡️ Valider & Tirage de la Finale"):
-            winners=[]; ok_all=True
-            for idx,(A,B) in enumerate(finals["demis"]):
-                raw=(st.session_state.get(f"rl_demi_{idx}") or "").strip()
-                sc=parse_score(raw)
-                if not sc: ok_all=False; break
-                s1,s2=sc
-                winners.append(A if s1>s2 else B)
-            if not ok_all or len(winners)!=2:
+            if not moteur.valider_demis(T):
                 st.warning("Veuillez compléter les scores des demi-finales.")
             else:
-                random.shuffle(winners)
-                st.session_state.finals["finale"] = [(winners[0], winners[1])]
+                oublier_widgets("rl_finale")
                 st.success("✅ Finale créée !")
                 st.rerun()
 
@@ -456,436 +592,264 @@ def section_rounds_libres():
     if finals["finale"]:
         st.subheader("🏁 Finale")
         (A,B) = finals["finale"][0]
-        c1,c2 = st.columns([3,1])
-        with c1:
-            st.write(f"**{A[0]} (H)+{A[1]} (F)  🆚  {B[0]} (H)+{B[1]} (F)**")
-        with c2:
-            st.text_input("Score final", key="rl_finale", label_visibility="collapsed")
+        ligne_score(f"**{A[0]} (H)+{A[1]} (F)  🆚  {B[0]} (H)+{B[1]} (F)**",
+                    "Score final", "rl_finale", A, B)
         if st.button("🏆 Déclarer le vainqueur"):
-            raw=(st.session_state.get("rl_finale") or "").strip()
-            sc=parse_score(raw)
-            if not sc:
+            vainqueur = moteur.declarer_vainqueur(T)
+            if not vainqueur:
                 st.warning("Renseigne le score final (ex: 6-4).")
             else:
-                s1,s2=sc
-                st.session_state.finals["vainqueur"] = A if s1>s2 else B
                 st.balloons()
-                st.success(f"🎉 Vainqueurs : **{st.session_state.finals['vainqueur'][0]} & {st.session_state.finals['vainqueur'][1]}** !")
+                st.success(f"🎉 Vainqueurs : **{vainqueur[0]} & {vainqueur[1]}** !")
 
 # =========================
-#   POULES AUTO + ÉLIMINATION
+#   POULES (AUTO & MANUELLES)
 # =========================
-def make_pairs_for_pools(nb_pairs):
-    H = hommes[:]; F = femmes[:]
-    random.shuffle(H); random.shuffle(F)
-    nb = min(len(H), len(F), nb_pairs)
-    return [(H[i],F[i]) for i in range(nb)]
-
-def round_robin_indices(n):
-    idxs = list(range(n))
-    if n % 2 == 1:
-        idxs.append(None); n += 1
-    half = n//2
-    schedule=[]; rows=idxs[:]
-    for _ in range(n-1):
-        pairings=[]
-        for i in range(half):
-            a = rows[i]; b = rows[n-1-i]
-            if a is not None and b is not None:
-                pairings.append((a,b))
-        rows = [rows[0]] + [rows[-1]] + rows[1:-1]
-        schedule.extend(pairings)
-    return schedule
-
-def build_pools():
-    nb_p = st.session_state.poules["params"]["nb_poules"]
-    tpp  = st.session_state.poules["params"]["teams_per_pool"]
-    total_needed = nb_p * tpp
-    teams = make_pairs_for_pools(total_needed)
-    if len(teams) < total_needed:
-        st.error(f"Pas assez de joueurs pour {nb_p} poule(s) de {tpp} équipes (il faut {total_needed} paires H+F).")
-        return False
-    st.session_state.poules["teams"] = teams
-    pools=[]
-    all_ids=list(range(total_needed))
-    for p in range(nb_p):
-        pool_ids = all_ids[p*tpp:(p+1)*tpp]
-        rr = round_robin_indices(tpp)
-        matches=[]
-        for (a,b) in rr:
-            matches.append((pool_ids[a], pool_ids[b]))
-        pools.append({"teams": pool_ids, "matches": matches})
-    st.session_state.poules["pools"]=pools
-    st.session_state.poules["main_bracket"]=[]
-    st.session_state.poules["cons_bracket"]=[]
-    return True
-
-def render_pools():
-    st.subheader("📦 Poules")
-    teams = st.session_state.poules["teams"]
-    pools = st.session_state.poules["pools"]
-
-    main_candidates=[]; cons_candidates=[]
-    for p_idx,pool in enumerate(pools):
+@st.cache_data(max_entries=CACHE_MAX_ENTREES, ttl=CACHE_TTL, show_spinner=False)
+def _table_poule_cache(cle, _t, name, p_idx):
+    return affichage.table_html(affichage.lignes_poule(_t, name, p_idx))
+
+@profilage.chrono("table_poule")
+def table_poule(t, name, p_idx):
+    """Table d'une poule, clé = saisies de cette poule seulement (les autres poules n'invalident rien)."""
+    pool = t.section(name)["pools"][p_idx]
+    prefix = moteur.PREFIXES[name]["pool"]
+    saisies = tuple(t.scores.get(f"{prefix}_{p_idx}_m_{m_idx}", "") for m_idx in range(len(pool["matches"])))
+    return _table_poule_cache((t.uid, t.rev, saisies), t, name, p_idx)
+
+@st.fragment
+@sous_verrou
+def fragment_poule(name, p_idx):
+    """Matchs + classement d'une poule : une saisie ne relance que cette poule."""
+    t = PARTAGE.tournoi
+    section = t.section(name)
+    if p_idx >= len(section["pools"]):
+        st.rerun()       # poules recréées ou tournoi remis à zéro par une autre session
+    teams = section["teams"]
+    pool = section["pools"][p_idx]
+    prefix = moteur.PREFIXES[name]["pool"]
+    st.markdown("**Équipes :** " + ", ".join([f"{teams[i][0]}+{teams[i][1]}" for i in pool["teams"]]))
+    for m_idx,(ti,tj) in enumerate(pool["matches"]):
+        e1,e2 = teams[ti], teams[tj]
+        c1,c2 = st.columns([3,1])
+        with c1: st.write(f"**Match {m_idx+1}:** {e1[0]}+{e1[1]} 🆚 {e2[0]}+{e2[1]}")
+        with c2: champ_score("Score (ex: 6-4)", f"{prefix}_{p_idx}_m_{m_idx}", e1, e2)
+
+    # Classement interne rapide
+    st.caption("Classement de la poule")
+    render_table_compact(table_poule(t, name, p_idx))
+
+def render_planning(name, suffixe=""):
+    """Matchs de poule répartis en créneaux × terrains (voir moteur.planifier_poules)."""
+    section = T.section(name)
+    with st.expander(f"🗓️ Planning des terrains{suffixe}"):
+        c1,c2 = st.columns([2,1])
+        with c1:
+            max_consec = st.number_input("Matchs d'affilée max par équipe (0 = sans limite)", 0, 12, 2,
+                                         key=f"max_consecutifs_{name}")
+        with c2:
+            if st.button(f"🗓️ Planifier sur {nb_terrains} terrain(s){suffixe}"):
+                moteur.planifier_poules(T, name, int(nb_terrains), int(max_consec))
+                st.rerun()
+        planning = section.get("planning")
+        if not planning:
+            st.info("Pas encore de planning.")
+            return
+        teams = section["teams"]
+        rows = []
+        for s_idx, creneau in enumerate(planning["creneaux"], start=1):
+            row = {"Créneau": s_idx}
+            for k,(p_idx,m_idx) in enumerate(creneau, start=1):
+                ti,tj = section["pools"][p_idx]["matches"][m_idx]
+                row[f"Terrain {k}"] = f"P{p_idx+1} · {teams[ti][0]}+{teams[ti][1]} / {teams[tj][0]}+{teams[tj][1]}"
+            rows.append(row)
+        st.caption(f"{len(rows)} créneau(x) sur {planning['terrains']} terrain(s), "
+                   f"minimum théorique {planning['borne']}.")
+        render_table_compact(rows)
+
+@profilage.chrono("render_pools")
+def render_pools(name, suffixe=""):
+    """Poules d'une section ("poules" ou "poules_manual") : matchs, scores, classements."""
+    section = T.section(name)
+    render_planning(name, suffixe)
+
+    for p_idx,pool in enumerate(section["pools"]):
         with st.expander(f"🏁 Poule {p_idx+1} – {len(pool['teams'])} équipes", expanded=True):
-            st.markdown("**Équipes :** " + ", ".join([f"{teams[i][0]}+{teams[i][1]}" for i in pool["teams"]]))
-            for m_idx,(ti,tj) in enumerate(pool["matches"]):
-                e1,e2 = teams[ti], teams[tj]
-                c1,c2 = st.columns([3,1])
-                with c1: st.write(f"**Match {m_idx+1}:** {e1[0]}+{e1[1]} 🆚 {e2[0]}+{e2[1]}")
-                with c2: st.text_input("Score (ex: 6-4)", key=f"pool_{p_idx}_m_{m_idx}", label_visibility="collapsed")
-
-            # Classement interne rapide
-            scs=[{"team":ti,"Pts":0.0,"Jeux":0} for ti in pool["teams"]]
-            def pos(team_id): 
-                for k,d in enumerate(scs):
-                    if d["team"]==team_id: return k
-
-            for m_idx,(ti,tj) in enumerate(pool["matches"]):
-                raw=(st.session_state.get(f"pool_{p_idx}_m_{m_idx}") or "").strip()
-                sc=parse_score(raw)
-                if not sc: continue
-                s1,s2=sc
-                ia=pos(ti); ib=pos(tj)
-                if s1>s2:
-                    scs[ia]["Pts"]+=3.0+s1*0.1; scs[ib]["Pts"]+=0.5+s2*0.1
-                else:
-                    scs[ib]["Pts"]+=3.0+s2*0.1; scs[ia]["Pts"]+=0.5+s1*0.1
-                scs[ia]["Jeux"]+=s1; scs[ib]["Jeux"]+=s2
-
-            scs=sorted(scs, key=lambda x:(x["Pts"],x["Jeux"]), reverse=True)
-            dfp=pd.DataFrame([{
-                "Equipe":f"{teams[d['team']][0]}+{teams[d['team']][1]}",
-                "Points":round(d["Pts"],1),
-                "Jeux":d["Jeux"],
-            } for d in scs])
-            dfp.index=dfp.index+1
-            st.caption("Classement de la poule")
-            render_table_compact(dfp)
-
-            if len(scs)>=2:
-                main_candidates += [ teams[scs[0]["team"]], teams[scs[1]["team"]] ]
-            if len(scs)>=4:
-                cons_candidates += [ teams[scs[2]["team"]], teams[scs[3]["team"]] ]
+            fragment_poule(name, p_idx)
 
     c1,c2=st.columns(2)
     with c1:
-        if st.button("🎲 Générer tableaux (principal & consolante)"):
-            if len(main_candidates)>=4:
-                tmp=main_candidates[:]; random.shuffle(tmp)
-                first_round=[]
-                for i in range(0,len(tmp),2):
-                    if i+1<len(tmp): first_round.append((tmp[i],tmp[i+1]))
-                st.session_state.poules["main_bracket"]=[first_round]
-            if len(cons_candidates)>=4:
-                tmpc=cons_candidates[:]; random.shuffle(tmpc)
-                first_round_c=[]
-                for i in range(0,len(tmpc),2):
-                    if i+1<len(tmpc): first_round_c.append((tmpc[i],tmpc[i+1]))
-                st.session_state.poules["cons_bracket"]=[first_round_c]
+        if st.button(f"🎲 Générer tableaux (principal & consolante){suffixe}"):
+            moteur.generer_tableaux(T, name)
+            pfx = moteur.PREFIXES[name]
+            oublier_widgets(pfx["main_bracket"] + "_r", pfx["cons_bracket"] + "_r")
             st.rerun()
     with c2:
-        if st.button("♻️ Reset tableaux"):
-            st.session_state.poules["main_bracket"]=[]
-            st.session_state.poules["cons_bracket"]=[]
-            st.success("Tableaux réinitialisés")
+        if st.button(f"♻️ Reset tableaux{suffixe}"):
+            moteur.reset_tableaux(T, name)
+            pfx = moteur.PREFIXES[name]
+            oublier_widgets(pfx["main_bracket"] + "_r", pfx["cons_bracket"] + "_r")
+            st.success("Tableaux (manuels) réinitialisés" if suffixe else "Tableaux réinitialisés")
             st.rerun()
 
-def render_bracket(title, key_prefix, bracket):
+@profilage.chrono("render_bracket")
+def render_bracket(title, name, bracket_name, suffixe=""):
     st.subheader(f"📈 {title}")
-    if not bracket:
+    teams = T.section(name)["teams"]
+    bracket = T.section(name)[bracket_name]
+    key_prefix = moteur.PREFIXES[name][bracket_name]
+    if not bracket["arbre"]:
         st.info("Aucun tour pour le moment.")
         return
-    for r_idx, rnd in enumerate(bracket, start=1):
-        with st.expander(f"Tour {r_idx} – {len(rnd)} match(s)", expanded=(r_idx==len(bracket))):
-            for m_idx,(A,B) in enumerate(rnd):
-                c1,c2=st.columns([3,1])
-                with c1:
-                    st.write(f"{A[0]}+{A[1]}  🆚  {B[0]}+{B[1]}")
-                with c2:
-                    st.text_input("Score (ex: 6-4)", key=f"{key_prefix}_r{r_idx}_m{m_idx}", label_visibility="collapsed")
-            if r_idx==len(bracket):
-                if st.button(f"✅ Valider le Tour {r_idx} ({title})"):
-                    winners=[]; ok=True
-                    for m_idx,(A,B) in enumerate(rnd):
-                        raw=(st.session_state.get(f"{key_prefix}_r{r_idx}_m{m_idx}") or "").strip()
-                        sc=parse_score(raw)
-                        if not sc: ok=False; break
-                        s1,s2=sc
-                        winners.append(A if s1>s2 else B)
-                    if not ok or len(winners)<2:
+    ouverts = moteur.tours_ouverts(bracket)
+    for r_idx in range(1, ouverts+1):
+        matchs = list(moteur.matchs_tour(bracket, r_idx))
+        en_cours = r_idx == bracket["valides"]+1
+        with st.expander(f"Tour {r_idx} – {len(matchs)} match(s)", expanded=(r_idx==ouverts)):
+            for m_idx,a,b in matchs:
+                A, B = teams[a], teams[b]
+                ligne_score(f"{A[0]}+{A[1]}  🆚  {B[0]}+{B[1]}",
+                            "Score (ex: 6-4)", f"{key_prefix}_r{r_idx}_m{m_idx}", A, B)
+            if en_cours:
+                if st.button(f"✅ Valider le Tour {r_idx} ({title}){suffixe}"):
+                    if not moteur.valider_tour(T, name, bracket_name):
                         st.warning("Complète tous les scores.")
                     else:
-                        random.shuffle(winners)
-                        next_round=[]
-                        for i in range(0,len(winners),2):
-                            if i+1<len(winners):
-                                next_round.append((winners[i], winners[i+1]))
-                        if next_round:
-                            bracket.append(next_round)
-                            st.rerun()
+                        st.rerun()
+    vainqueur = moteur.champion(bracket)
+    if vainqueur is not None:
+        A = teams[vainqueur]
+        st.success(f"🏆 Vainqueurs : **{A[0]} & {A[1]}**")
 
+def classement_agrege():
+    st.markdown("---")
+    st.header("📈 Classement général (agrégé)")
+    fragment_classement("Aucun résultat.")
+
+@profilage.chrono("section_poules")
 def section_poules():
     st.title("🎾 Tournoi de Padel – Poules + Élimination")
     nb_p = st.number_input("Nombre de poules", 1, 16,
-                           value=st.session_state.poules["params"]["nb_poules"], key="nb_poules")
+                           value=T.poules["params"]["nb_poules"], key="nb_poules")
     tpp  = st.number_input("Équipes par poule (paires H+F)", 2, 12,
-                           value=st.session_state.poules["params"]["teams_per_pool"], key="teams_per_pool")
-    st.session_state.poules["params"]["nb_poules"]=int(nb_p)
-    st.session_state.poules["params"]["teams_per_pool"]=int(tpp)
+                           value=T.poules["params"]["teams_per_pool"], key="teams_per_pool")
+    moteur.regler_poules(T, "poules", int(nb_p), int(tpp))
+    equilibre = st.checkbox("⚖️ Équilibrer les poules selon les niveaux", value=bool(T.niveaux),
+                            key="equilibre_poules", disabled=not T.niveaux,
+                            help="Paires et poules de force homogène (niveaux du roster importé ; "
+                                 "niveau manquant = moyenne). Sinon : tirage au sort.")
 
     if st.button("⚡ Créer / Recréer les poules", type="primary"):
-        if build_pools(): st.rerun()
+        try:
+            moteur.build_pools(T, *roster_partage(T), equilibre=equilibre and bool(T.niveaux))
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            oublier_widgets_section("poules")
+            st.rerun()
 
-    if st.session_state.poules["pools"]:
-        render_pools()
+    if T.poules["pools"]:
+        st.subheader("📦 Poules")
+        forces = moteur.forces_poules(T, "poules")
+        if forces:
+            st.caption("Force moyenne des équipes : " + " · ".join(f"P{i} {f:.2f}" for i, f in enumerate(forces, start=1)))
+        render_pools("poules")
 
     st.markdown("---")
     st.header("🏆 Tableaux à élimination directe")
-    render_bracket("Tableau principal", "main_bracket", st.session_state.poules["main_bracket"])
-    render_bracket("Tableau consolante", "cons_bracket", st.session_state.poules["cons_bracket"])
+    render_bracket("Tableau principal", "poules", "main_bracket")
+    render_bracket("Tableau consolante", "poules", "cons_bracket")
 
-    st.markdown("---")
-    st.header("📈 Classement général (agrégé)")
-    maj_classement_global()
-    df = df_classement()
-    if df.empty:
-        st.info("Aucun résultat.")
-    else:
-        df.insert(0,"Rang", df.index+1)
-        render_table_compact(df)
+    classement_agrege()
 
 # =========================
 #   POULES MANUELLES
 # =========================
-def build_pools_manual():
-    """Construit les poules à partir des sélections manuelles H/F."""
-    nb_p = st.session_state.poules_manual["params"]["nb_poules"]
-    tpp  = st.session_state.poules_manual["params"]["teams_per_pool"]
-    total_needed = nb_p * tpp
-
-    # Lire sélections
-    sels = st.session_state.poules_manual["selections"]
-    pairs = []
-    usedH=set(); usedF=set()
-    for p in range(nb_p):
-        for s in range(tpp):
-            h_key=f"pm_{p}_{s}_H"; f_key=f"pm_{p}_{s}_F"
-            h = sels.get(h_key, "")
-            f = sels.get(f_key, "")
-            if h and f:
-                pairs.append((h,f))
-                usedH.add(h); usedF.add(f)
-
-    if len(pairs) != total_needed:
-        st.error(f"Il faut définir **exactement {total_needed}** équipes (1 H + 1 F).")
-        return False
-
-    # Construire pools + round-robin
-    st.session_state.poules_manual["teams"] = pairs
-    pools=[]
-    all_ids=list(range(total_needed))
-    for p in range(nb_p):
-        pool_ids = all_ids[p*tpp:(p+1)*tpp]
-        rr = round_robin_indices(tpp)
-        matches=[]
-        for (a,b) in rr:
-            matches.append((pool_ids[a], pool_ids[b]))
-        pools.append({"teams": pool_ids, "matches": matches})
-    st.session_state.poules_manual["pools"]=pools
-    st.session_state.poules_manual["main_bracket"]=[]
-    st.session_state.poules_manual["cons_bracket"]=[]
-    return True
-
-def render_pools_manual():
-    st.subheader("📦 Poules (manuelles)")
-    teams = st.session_state.poules_manual["teams"]
-    pools = st.session_state.poules_manual["pools"]
-
-    main_candidates=[]; cons_candidates=[]
-    for p_idx,pool in enumerate(pools):
-        with st.expander(f"🏁 Poule {p_idx+1} – {len(pool['teams'])} équipes", expanded=True):
-            st.markdown("**Équipes :** " + ", ".join([f"{teams[i][0]}+{teams[i][1]}" for i in pool["teams"]]))
-            for m_idx,(ti,tj) in enumerate(pool["matches"]):
-                e1,e2 = teams[ti], teams[tj]
-                c1,c2 = st.columns([3,1])
-                with c1: st.write(f"**Match {m_idx+1}:** {e1[0]}+{e1[1]} 🆚 {e2[0]}+{e2[1]}")
-                with c2: st.text_input("Score (ex: 6-4)", key=f"mpool_{p_idx}_m_{m_idx}", label_visibility="collapsed")
-
-            # Classement interne rapide (mêmes règles)
-            scs=[{"team":ti,"Pts":0.0,"Jeux":0} for ti in pool["teams"]]
-            def pos(team_id): 
-                for k,d in enumerate(scs):
-                    if d["team"]==team_id: return k
-
-            for m_idx,(ti,tj) in enumerate(pool["matches"]):
-                raw=(st.session_state.get(f"mpool_{p_idx}_m_{m_idx}") or "").strip()
-                sc=parse_score(raw)
-                if not sc: continue
-                s1,s2=sc
-                ia=pos(ti); ib=pos(tj)
-                if s1>s2:
-                    scs[ia]["Pts"]+=3.0+s1*0.1; scs[ib]["Pts"]+=0.5+s2*0.1
-                else:
-                    scs[ib]["Pts"]+=3.0+s2*0.1; scs[ia]["Pts"]+=0.5+s1*0.1
-                scs[ia]["Jeux"]+=s1; scs[ib]["Jeux"]+=s2
-
-            scs=sorted(scs, key=lambda x:(x["Pts"],x["Jeux"]), reverse=True)
-            dfp=pd.DataFrame([{
-                "Equipe":f"{teams[d['team']][0]}+{teams[d['team']][1]}",
-                "Points":round(d["Pts"],1),
-                "Jeux":d["Jeux"],
-            } for d in scs])
-            dfp.index=dfp.index+1
-            st.caption("Classement de la poule")
-            render_table_compact(dfp)
-
-            if len(scs)>=2:
-                main_candidates += [ teams[scs[0]["team"]], teams[scs[1]["team"]] ]
-            if len(scs)>=4:
-                cons_candidates += [ teams[scs[2]["team"]], teams[scs[3]["team"]] ]
-
-    c1,c2=st.columns(2)
-    with c1:
-        if st.button("🎲 Générer tableaux (principal & consolante) – Poules manuelles"):
-            if len(main_candidates)>=4:
-                tmp=main_candidates[:]; random.shuffle(tmp)
-                first_round=[]
-                for i in range(0,len(tmp),2):
-                    if i+1<len(tmp): first_round.append((tmp[i],tmp[i+1]))
-                st.session_state.poules_manual["main_bracket"]=[first_round]
-            if len(cons_candidates)>=4:
-                tmpc=cons_candidates[:]; random.shuffle(tmpc)
-                first_round_c=[]
-                for i in range(0,len(tmpc),2):
-                    if i+1<len(tmpc): first_round_c.append((tmpc[i],tmpc[i+1]))
-                st.session_state.poules_manual["cons_bracket"]=[first_round_c]
-            st.rerun()
-    with c2:
-        if st.button("♻️ Reset tableaux – Poules manuelles"):
-            st.session_state.poules_manual["main_bracket"]=[]
-            st.session_state.poules_manual["cons_bracket"]=[]
-            st.success("Tableaux (manuels) réinitialisés")
-            st.rerun()
-
-def render_bracket_manual(title, key_prefix, bracket):
-    st.subheader(f"📈 {title}")
-    if not bracket:
-        st.info("Aucun tour pour le moment.")
-        return
-    for r_idx, rnd in enumerate(bracket, start=1):
-        with st.expander(f"Tour {r_idx} – {len(rnd)} match(s)", expanded=(r_idx==len(bracket))):
-            for m_idx,(A,B) in enumerate(rnd):
-                c1,c2=st.columns([3,1])
-                with c1:
-                    st.write(f"{A[0]}+{A[1]}  🆚  {B[0]}+{B[1]}")
-                with c2:
-                    st.text_input("Score (ex: 6-4)", key=f"{key_prefix}_r{r_idx}_m{m_idx}", label_visibility="collapsed")
-            if r_idx==len(bracket):
-                if st.button(f"✅ Valider le Tour {r_idx} ({title}) – Poules manuelles"):
-                    winners=[]; ok=True
-                    for m_idx,(A,B) in enumerate(rnd):
-                        raw=(st.session_state.get(f"{key_prefix}_r{r_idx}_m{m_idx}") or "").strip()
-                        sc=parse_score(raw)
-                        if not sc: ok=False; break
-                        s1,s2=sc
-                        winners.append(A if s1>s2 else B)
-                    if not ok or len(winners)<2:
-                        st.warning("Complète tous les scores.")
-                    else:
-                        random.shuffle(winners)
-                        next_round=[]
-                        for i in range(0,len(winners),2):
-                            if i+1<len(winners):
-                                next_round.append((winners[i], winners[i+1]))
-                        if next_round:
-                            bracket.append(next_round)
-                            st.rerun()
-
+@profilage.chrono("section_poules_manual")
 def section_poules_manual():
     st.title("🎾 Tournoi de Padel – Poules (manuelles)")
-    pm = st.session_state.poules_manual
+    pm = T.poules_manual
 
     nb_p = st.number_input("Nombre de poules", 1, 16,
                            value=pm["params"]["nb_poules"], key="m_nb_poules")
     tpp  = st.number_input("Équipes par poule (paires H+F)", 2, 12,
                            value=pm["params"]["teams_per_pool"], key="m_teams_per_pool")
-    pm["params"]["nb_poules"]=int(nb_p)
-    pm["params"]["teams_per_pool"]=int(tpp)
-    total_needed = pm["params"]["nb_poules"] * pm["params"]["teams_per_pool"]
+    moteur.regler_poules(T, "poules_manual", int(nb_p), int(tpp))
 
     st.caption("Sélectionne **manuellement** chaque équipe (1 homme + 1 femme) par poule.")
     sels = pm["selections"]
 
-    # aide : pour éviter les doublons, on suit les choix courants
-    def current_used():
-        usedH=set(); usedF=set()
-        for p in range(pm["params"]["nb_poules"]):
-            for s in range(pm["params"]["teams_per_pool"]):
-                h=sels.get(f"pm_{p}_{s}_H","")
-                f=sels.get(f"pm_{p}_{s}_F","")
-                if h: usedH.add(h)
-                if f: usedF.add(f)
-        return usedH, usedF
+    # index pris/libres entretenu slot par slot : les options d'un slot excluent les joueurs déjà choisis
+    index = moteur.index_selections(T)
 
     for p in range(pm["params"]["nb_poules"]):
         with st.expander(f"✍️ Poule {p+1} – définir {pm['params']['teams_per_pool']} équipes", expanded=True):
             for s in range(pm["params"]["teams_per_pool"]):
-                usedH, usedF = current_used()
-                h_key=f"pm_{p}_{s}_H"; f_key=f"pm_{p}_{s}_F"
-                # autoriser le choix déjà sélectionné pour ce slot (sinon il disparaît des options)
-                current_h = sels.get(h_key,"")
-                current_f = sels.get(f_key,"")
-                optH = [x for x in hommes if x==current_h or x not in usedH]
-                optF = [x for x in femmes if x==current_f or x not in usedF]
                 c1,c2 = st.columns(2)
-                with c1:
-                    sels[h_key] = st.selectbox(
-                        f"Equipe {s+1} – Homme", optH, index=optH.index(current_h) if current_h in optH else 0 if optH else None, key=h_key
-                    ) if optH else ""
-                with c2:
-                    sels[f_key] = st.selectbox(
-                        f"Equipe {s+1} – Femme", optF, index=optF.index(current_f) if current_f in optF else 0 if optF else None, key=f_key
-                    ) if optF else ""
+                for col, key, label in ((c1, f"pm_{p}_{s}_H", "Homme"), (c2, f"pm_{p}_{s}_F", "Femme")):
+                    # le choix déjà sélectionné pour ce slot reste dans ses options
+                    opts = index.options(key)
+                    current = sels.get(key,"")
+                    with col:
+                        choix = st.selectbox(
+                            f"Equipe {s+1} – {label}", opts, index=opts.index(current) if current in opts else 0, key=key
+                        ) if opts else ""
+                    if choix != current:
+                        moteur.choisir_selection(T, key, choix)
 
     c1,c2 = st.columns(2)
     with c1:
         if st.button("⚡ Créer / Mettre à jour les poules (manuelles)", type="primary"):
-            if build_pools_manual():
+            try:
+                moteur.build_pools_manual(T)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                oublier_widgets_section("poules_manual")
                 st.success(f"✅ {pm['params']['nb_poules']} poule(s) créées.")
                 st.rerun()
     with c2:
         if st.button("♻️ Reset (sélections & tableaux manuels)"):
-            pm["selections"]={}
-            pm["teams"]=[]; pm["pools"]=[]; pm["main_bracket"]=[]; pm["cons_bracket"]=[]
+            moteur.reset_poules_manual(T)
+            oublier_widgets_section("poules_manual")
             st.success("Tout a été réinitialisé pour les poules manuelles.")
             st.rerun()
 
     # Rendu des poules si dispo
     if pm["pools"]:
-        render_pools_manual()
+        st.subheader("📦 Poules (manuelles)")
+        render_pools("poules_manual", " – Poules manuelles")
 
     st.markdown("---")
     st.header("🏆 Tableaux à élimination directe (manuels)")
-    render_bracket_manual("Tableau principal (man.)", "manual_main_bracket", pm["main_bracket"])
-    render_bracket_manual("Tableau consolante (man.)", "manual_cons_bracket", pm["cons_bracket"])
+    render_bracket("Tableau principal (man.)", "poules_manual", "main_bracket", " – Poules manuelles")
+    render_bracket("Tableau consolante (man.)", "poules_manual", "cons_bracket", " – Poules manuelles")
 
-    st.markdown("---")
-    st.header("📈 Classement général (agrégé)")
-    maj_classement_global()
-    df = df_classement()
-    if df.empty:
-        st.info("Aucun résultat.")
-    else:
-        df.insert(0,"Rang", df.index+1)
-        render_table_compact(df)
+    classement_agrege()
 
 # =========================
 #   ROUTAGE
 # =========================
-if st.session_state.mode == "Rounds libres":
-    section_rounds_libres()
-elif st.session_state.mode == "Poules + Élimination":
-    section_poules()
-else:  # Poules (manuelles)
-    section_poules_manual()
+# une session organisateur à la fois modifie le tournoi partagé (les spectateurs attendent la fin)
+with PARTAGE.verrou:
+    if st.session_state.mode in FORMULES:
+        section_rounds_libres(FORMULES[st.session_state.mode], st.session_state.mode)
+    elif st.session_state.mode == "Poules + Élimination":
+        section_poules()
+    else:  # Poules (manuelles)
+        section_poules_manual()
+
+    # Persistance : instantané si la structure a changé pendant ce rerun
+    STORE.sauver_si_modifie(T)
+    publier_affichage()
+
+# =========================
+#   PROFILAGE
+# =========================
+if PROFIL:
+    PROFIL.compteurs.update(joueurs=len(T.joueurs), matchs=len(moteur.index_matchs(T)),
+                            scores=len(T.scores), revision=T.rev, version=T.version)
+    total = profilage.ecrire(PROFIL)
+    with st.sidebar.expander(f"⏱️ Dernier rerun : {total*1000:.0f} ms", expanded=True):
+        render_table_compact(PROFIL.lignes())
+        st.caption(" · ".join(f"{k} {v}" for k, v in PROFIL.compteurs.items()))
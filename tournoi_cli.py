@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Pilote en ligne de commande du moteur (sans Streamlit).
+
+Exemples :
+    python tournoi_cli.py --hommes hommes.txt --femmes femmes.txt --terrains 10 --max-matchs 20 --planning
+    python tournoi_cli.py --hommes hommes.txt --femmes femmes.txt --mode poules --poules 4 --equipes 6 \\
+        --seed 7 --scores scores.csv --top 20 --temps
+
+Les fichiers de roster contiennent un nom par ligne ; --roster lit à la place un
+CSV/XLSX unique (colonnes nom, sexe, niveau facultatif, voir fichiers.py). Le fichier de scores contient une
+ligne `clé,score` par match (ex. `score_1_0,6-4`, `pool_0_m_2,3-6`) ; avec le même
+--seed, le planning régénéré est identique et les clés correspondent.
+"""
+import argparse
+import random
+import sys
+import time
+
+import fichiers
+import moteur
+
+def lire_noms(path):
+    with open(path, encoding="utf-8") as fh:
+        return [l.strip() for l in fh if l.strip()]
+
+def afficher_table(rows, cols, out=sys.stdout):
+    if not rows:
+        print("(vide)", file=out); return
+    cells = [[str(r[c]) for c in cols] for r in rows]
+    widths = [max(len(c), *(len(x[i]) for x in cells)) for i, c in enumerate(cols)]
+    print("  ".join(c.ljust(w) for c, w in zip(cols, widths)), file=out)
+    for x in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(x, widths)), file=out)
+
+def afficher_planning(t, out=sys.stdout):
+    for key, e1, e2 in moteur.iter_matchs_scores(t):
+        print(f"{key}\t{'+'.join(e1)}\t{'+'.join(e2)}", file=out)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Tournoi de padel – moteur en ligne de commande")
+    ap.add_argument("--hommes", help="fichier : un homme par ligne")
+    ap.add_argument("--femmes", help="fichier : une femme par ligne")
+    ap.add_argument("--roster", help="CSV/XLSX nom,sexe[,niveau] (remplace --hommes/--femmes)")
+    ap.add_argument("--mode", choices=["rounds", "poules"], default="rounds")
+    ap.add_argument("--terrains", type=int, default=4)
+    ap.add_argument("--max-matchs", type=int, default=4)
+    ap.add_argument("--diversite", action="store_true", help="rounds : varier partenaires et adversaires")
+    ap.add_argument("--budget", type=float, default=0.2, help="secondes max d'optimisation par round (--diversite)")
+    ap.add_argument("--poules", type=int, default=2)
+    ap.add_argument("--equipes", type=int, default=4, help="équipes par poule")
+    ap.add_argument("--equilibre", action="store_true", help="poules : paires et poules de force homogène (niveaux de --roster)")
+    ap.add_argument("--seed", type=int, default=None, help="graine du tirage (planning reproductible)")
+    ap.add_argument("--scores", help="fichier clé,score à intégrer")
+    ap.add_argument("--planning", action="store_true", help="affiche le planning (clé, équipe 1, équipe 2)")
+    ap.add_argument("--creneaux", action="store_true", help="poules : matchs répartis en créneaux × terrains")
+    ap.add_argument("--consecutifs", type=int, default=2, help="matchs d'affilée max par équipe (--creneaux)")
+    ap.add_argument("--top", type=int, default=0, help="n'affiche que les N premiers (0 = tous)")
+    ap.add_argument("--temps", action="store_true", help="chronométrage de chaque étape sur stderr")
+    ap.add_argument("--db", help="base SQLite où enregistrer l'état final (voir stockage.py)")
+    ap.add_argument("--export", metavar="DOSSIER", help="exporte classement, rounds, poules et tableaux")
+    ap.add_argument("--format", choices=["csv", "parquet"], default="csv", help="format de --export")
+    ap.add_argument("--affichage", metavar="DOSSIER", help="écrit le tableau d'affichage (index.html + scoreboard.json)")
+    args = ap.parse_args(argv)
+    if not args.roster and not (args.hommes and args.femmes):
+        ap.error("--roster ou --hommes et --femmes sont requis")
+    if args.terrains < 1:
+        ap.error("--terrains doit valoir au moins 1")
+
+    rng = random.Random(args.seed)
+    chrono = {}
+    def etape(nom, t0):
+        chrono[nom] = time.perf_counter() - t0
+
+    t = moteur.Tournoi()
+    t0 = time.perf_counter()
+    niveaux = None
+    if args.roster:
+        try:
+            with open(args.roster, "rb") as fh:
+                r = fichiers.lire_roster(fichiers.lignes_fichier(fh, args.roster))
+        except ValueError as e:
+            print(f"Erreur : {e}", file=sys.stderr)
+            return 2
+        for n, motif in r["erreurs"]:
+            print(f"roster ligne {n} : {motif}", file=sys.stderr)
+        if not r["hommes"] and not r["femmes"]:
+            print("Erreur : aucune ligne valide dans le roster.", file=sys.stderr)
+            return 2
+        hommes, femmes, niveaux = r["hommes"], r["femmes"], r["niveaux"]
+    else:
+        hommes, femmes = lire_noms(args.hommes), lire_noms(args.femmes)
+    moteur.sync_joueurs(t, hommes, femmes, niveaux)
+    etape("roster", t0)
+
+    t0 = time.perf_counter()
+    if args.mode == "rounds":
+        n = moteur.generer_tous_rounds(t, args.terrains, args.max_matchs, rng, args.diversite, args.budget)
+        print(f"{n} round(s) générés", file=sys.stderr)
+    else:
+        t.poules["params"].update(nb_poules=args.poules, teams_per_pool=args.equipes)
+        try:
+            moteur.build_pools(t, hommes, femmes, rng, args.equilibre, args.budget)
+        except ValueError as e:
+            print(f"Erreur : {e}", file=sys.stderr)
+            return 2
+    etape("planning", t0)
+
+    if args.planning:
+        afficher_planning(t)
+
+    if args.creneaux and args.mode == "poules":
+        t0 = time.perf_counter()
+        planning = moteur.planifier_poules(t, "poules", args.terrains, args.consecutifs)
+        etape("creneaux", t0)
+        for s, creneau in enumerate(planning["creneaux"], start=1):
+            print(f"{s}\t" + "\t".join(f"pool_{p}_m_{m}" for p, m in creneau))
+        print(f"{len(planning['creneaux'])} créneau(x), minimum {planning['borne']}", file=sys.stderr)
+
+    if args.scores:
+        t0 = time.perf_counter()
+        with open(args.scores, encoding="utf-8") as fh:
+            items, erreurs = fichiers.valider_scores(t, fichiers.lire_scores(fh))
+        for n, motif in erreurs:
+            print(f"ligne {n} : {motif}", file=sys.stderr)
+        moteur.saisir_scores(t, items)
+        etape("scores", t0)
+
+    t0 = time.perf_counter()
+    rows = moteur.classement(t)
+    etape("classement", t0)
+    for i, r in enumerate(rows, start=1):
+        r["Rang"] = i
+    afficher_table(rows[:args.top] if args.top else rows, ["Rang","Joueur","Sexe","Points","Jeux","Matchs"])
+
+    if args.db:
+        import stockage
+        t0 = time.perf_counter()
+        store = stockage.Stockage(args.db)
+        store.nouveau_tournoi()
+        store.instantane(t)
+        store.fermer()
+        etape("db", t0)
+
+    if args.export:
+        import os
+        t0 = time.perf_counter()
+        os.makedirs(args.export, exist_ok=True)
+        for table in fichiers.TABLES:
+            chemin = os.path.join(args.export, f"{table}.{args.format}")
+            try:
+                with open(chemin, "wb") as fh:
+                    n = fichiers.exporter(t, table, fh, args.format)
+            except ValueError as e:
+                print(f"Erreur : {e}", file=sys.stderr)
+                return 2
+            print(f"{chemin} : {n} ligne(s)", file=sys.stderr)
+        etape("export", t0)
+
+    if args.affichage:
+        import affichage
+        t0 = time.perf_counter()
+        affichage.Affichage(args.affichage).publier(t)
+        print(f"{args.affichage} : index.html, scoreboard.json", file=sys.stderr)
+        etape("affichage", t0)
+
+    if args.temps:
+        for nom, dt in chrono.items():
+            print(f"{nom:<11} {dt*1000:9.2f} ms", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())